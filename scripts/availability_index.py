@@ -0,0 +1,145 @@
+import argparse
+import json
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+
+from normalization import normalize_program_key, normalize_text
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PAYLOAD_PATH = BASE_DIR / "scripts" / "availability_payload.json"
+QUERY_CACHE_SIZE = 4096
+
+
+class AvailabilityRecord:
+    """One availability entry, without the per-instance dict of a plain entry."""
+
+    __slots__ = ("position", "id", "plantel", "programa", "modalidad", "horario", "plan_url", "activo")
+
+    def __init__(self, position, entry):
+        self.position = position
+        self.id = entry.get("id")
+        self.plantel = entry.get("plantel")
+        self.programa = entry.get("programa")
+        self.modalidad = entry.get("modalidad")
+        self.horario = entry.get("horario")
+        self.plan_url = entry.get("planUrl")
+        self.activo = entry.get("activo")
+
+    def to_entry(self):
+        return {
+            "id": self.id,
+            "plantel": self.plantel,
+            "programa": self.programa,
+            "modalidad": self.modalidad,
+            "horario": self.horario,
+            "planUrl": self.plan_url,
+            "activo": self.activo,
+        }
+
+    def __repr__(self):
+        return f"AvailabilityRecord({self.plantel!r}, {self.programa!r}, {self.modalidad!r})"
+
+
+def contains_sorted(values, value) -> bool:
+    idx = bisect_left(values, value)
+    return idx < len(values) and values[idx] == value
+
+
+class AvailabilityIndex:
+    """Availability entries with plantel, program key and modalidad indexes.
+
+    Each index maps a normalized value to the ascending positions of its
+    entries, so a query intersects the shortest list with the others by
+    bisection and returns records in payload order. Results are kept in a
+    bounded LRU cache keyed by the normalized query.
+    """
+
+    def __init__(self, entries, cache_size=QUERY_CACHE_SIZE):
+        self.records = []
+        self.by_plantel = {}
+        self.by_program = {}
+        self.by_modalidad = {}
+        for position, entry in enumerate(entries):
+            self.records.append(AvailabilityRecord(position, entry))
+            self.by_plantel.setdefault(normalize_text(entry.get("plantel")), []).append(position)
+            self.by_program.setdefault(normalize_program_key(entry.get("programa")), []).append(position)
+            self.by_modalidad.setdefault(normalize_text(entry.get("modalidad")), []).append(position)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: Path = PAYLOAD_PATH, cache_size=QUERY_CACHE_SIZE):
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(payload["availability"], cache_size)
+
+    def __len__(self):
+        return len(self.records)
+
+    def positions(self, plantel=None, programa=None, modalidad=None):
+        """Ascending positions of the entries matching every given criterion."""
+        return self.match(
+            None if plantel is None else normalize_text(plantel),
+            None if programa is None else normalize_program_key(programa),
+            None if modalidad is None else normalize_text(modalidad),
+        )
+
+    def match(self, plantel_key=None, program_key=None, modalidad_key=None):
+        """``positions`` for values that are already normalized."""
+        key = (plantel_key, program_key, modalidad_key)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return cached
+        self.misses += 1
+        result = self._intersect(key)
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def _intersect(self, key):
+        lists = [
+            index.get(value, ())
+            for index, value in zip((self.by_plantel, self.by_program, self.by_modalidad), key)
+            if value is not None
+        ]
+        if not lists:
+            return tuple(range(len(self.records)))
+        lists.sort(key=len)
+        shortest, others = lists[0], lists[1:]
+        return tuple(position for position in shortest if all(contains_sorted(other, position) for other in others))
+
+    def query(self, plantel=None, programa=None, modalidad=None):
+        return [self.records[position] for position in self.positions(plantel, programa, modalidad)]
+
+    def programs(self, plantel, modalidad=None):
+        """Distinct programs a plantel offers (in a modalidad), first-seen order."""
+        return list(dict.fromkeys(record.programa for record in self.query(plantel=plantel, modalidad=modalidad)))
+
+    def planteles(self, programa, modalidad=None):
+        """Distinct planteles offering a program (in a modalidad), first-seen order."""
+        return list(dict.fromkeys(record.plantel for record in self.query(programa=programa, modalidad=modalidad)))
+
+    def cache_info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache), "maxSize": self.cache_size}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the availability payload by plantel, program and modalidad.")
+    parser.add_argument("payload", type=Path, nargs="?", default=PAYLOAD_PATH)
+    parser.add_argument("--plantel")
+    parser.add_argument("--programa")
+    parser.add_argument("--modalidad")
+    args = parser.parse_args(argv)
+
+    index = AvailabilityIndex.load(args.payload)
+    for record in index.query(args.plantel, args.programa, args.modalidad):
+        print(json.dumps(record.to_entry(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
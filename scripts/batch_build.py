@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from benefit_index import BenefitIndex
+from build_availability_from_xlsx import ONLINE_ALLOWLIST, assemble_payload, collect_availability, write_payload
+from build_benefit_rules_from_csvs import build_rules, compact_rules, write_rules
+from build_metrics import StageTimer
+from extract_plan_urls import plan_urls_from_rows, read_plan_urls
+from json_output import write_json
+from workbook_snapshot import SNAPSHOT_DIR
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MANIFEST_PATH = BASE_DIR / "scripts" / "tenants.json"
+REPORT_PATH = BASE_DIR / "scripts" / "batch_report.json"
+JOB_KINDS = ("availability", "benefits")
+REQUIRED_FIELDS = {
+    "availability": ("xlsx", "output"),
+    "benefits": ("licenciatura", "licenciaturaOnline", "bachillerato", "output"),
+}
+
+# Manifest layout (paths are relative to the manifest file):
+#
+# {"tenants": [{
+#     "slug": "unidep",
+#     "availability": {"xlsx": "...xlsx", "planUrls": "programs_plan_urls.csv",
+#                      "allowlist": ["..."] | "allowlist.txt", "cache": ".cache.json", "stream": false,
+#                      "output": "unidep/availability_payload.json"},
+#     "benefits": {"licenciatura": "...csv", "licenciaturaOnline": "...csv", "bachillerato": "...csv",
+#                  "output": "unidep/benefit_rules.json", "index": "unidep/benefit_rules_index.json"}
+# }]}
+#
+# A tenant may list either section or both; each one is a separate job.
+
+
+def resolve_path(base: Path, value):
+    return None if value in (None, "") else (base / value).resolve()
+
+
+def load_allowlist(base: Path, value):
+    if value is None:
+        return ONLINE_ALLOWLIST
+    if isinstance(value, list):
+        return value
+    # One program per line; blank lines and # comments are ignored.
+    lines = resolve_path(base, value).read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+def load_manifest(path: Path):
+    """(jobs, problems) for the manifest at ``path``; jobs are (slug, kind, config)."""
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    base = path.resolve().parent
+    jobs = []
+    problems = []
+    seen = set()
+    for position, tenant in enumerate(manifest.get("tenants", [])):
+        slug = tenant.get("slug")
+        if not slug:
+            problems.append(f"tenant #{position + 1} has no slug")
+            continue
+        if slug in seen:
+            problems.append(f"{slug}: listed more than once")
+            continue
+        seen.add(slug)
+        kinds = [kind for kind in JOB_KINDS if kind in tenant]
+        if not kinds:
+            problems.append(f"{slug}: no availability or benefits section")
+        for kind in kinds:
+            config = tenant[kind]
+            missing = [name for name in REQUIRED_FIELDS[kind] if not config.get(name)]
+            if missing:
+                problems.append(f"{slug}: {kind} is missing {', '.join(missing)}")
+                continue
+            jobs.append((slug, kind, {"base": str(base), **config}))
+    return jobs, problems
+
+
+def build_tenant_availability(config, timer, snapshot_dir):
+    base = Path(config["base"])
+    plan_urls = resolve_path(base, config.get("planUrls"))
+    with timer.stage("plan_urls"):
+        plan_url_by_program = plan_urls_from_rows(read_plan_urls(plan_urls)) if plan_urls else {}
+    allowlist = load_allowlist(base, config.get("allowlist"))
+    availability, debug, _ = collect_availability(
+        resolve_path(base, config["xlsx"]),
+        1,
+        resolve_path(base, config.get("cache")),
+        timer=timer,
+        snapshot_dir=snapshot_dir,
+        stream=bool(config.get("stream")),
+    )
+    payload = assemble_payload(availability, debug, plan_url_by_program, allowlist, timer=timer)
+    output = resolve_path(base, config["output"])
+    written = timer.run("serialize", write_payload, payload, output)
+    return {"entries": len(payload["availability"]), "output": str(output), "written": written["written"]}
+
+
+def build_tenant_benefits(config, timer, snapshot_dir):
+    base = Path(config["base"])
+    raw_rules = timer.run(
+        "read_csvs",
+        build_rules,
+        resolve_path(base, config["licenciatura"]),
+        resolve_path(base, config["licenciaturaOnline"]),
+        resolve_path(base, config["bachillerato"]),
+    )
+    rules = timer.run("compact", compact_rules, raw_rules)
+    output = resolve_path(base, config["output"])
+    written = timer.run("serialize", write_rules, rules, output)
+    index_path = resolve_path(base, config.get("index")) or output.with_name(f"{output.stem}_index.json")
+    with timer.stage("index"):
+        write_json(BenefitIndex.from_rules(rules).to_json(), index_path)
+    return {
+        "rules": len(rules),
+        "rawRules": len(raw_rules),
+        "output": str(output),
+        "index": str(index_path),
+        "written": written["written"],
+    }
+
+
+JOB_BUILDERS = {"availability": build_tenant_availability, "benefits": build_tenant_benefits}
+
+
+def run_job(slug, kind, config, snapshot_dir=SNAPSHOT_DIR):
+    # Never raises: a failing tenant is reported, the rest of the batch goes on.
+    timer = StageTimer()
+    start = time.perf_counter()
+    result = {"slug": slug, "kind": kind, "pid": os.getpid()}
+    try:
+        result.update(JOB_BUILDERS[kind](config, timer, snapshot_dir))
+        result["status"] = "ok"
+    except Exception as exc:
+        result["status"] = "failed"
+        result["error"] = f"{type(exc).__name__}: {exc}"
+        result["traceback"] = traceback.format_exc()
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    result["stages"] = timer.stages
+    return result
+
+
+def run_batch(jobs, workers=1, snapshot_dir=SNAPSHOT_DIR):
+    """Results for every job, in manifest order, run on at most ``workers`` processes."""
+    if workers <= 1 or len(jobs) <= 1:
+        return [run_job(slug, kind, config, snapshot_dir) for slug, kind, config in jobs]
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {
+            pool.submit(run_job, slug, kind, config, snapshot_dir): idx for idx, (slug, kind, config) in enumerate(jobs)
+        }
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                results[idx] = future.result()
+            except Exception as exc:
+                # The worker itself died (e.g. killed or out of memory).
+                slug, kind, _ = jobs[idx]
+                results[idx] = {"slug": slug, "kind": kind, "status": "failed", "error": f"{type(exc).__name__}: {exc}"}
+    return results
+
+
+def format_batch_report(results, total_seconds):
+    lines = []
+    for result in results:
+        label = f"{result['slug']}/{result['kind']}"
+        if result["status"] == "ok":
+            count = f"{result['entries']} entries" if "entries" in result else f"{result['rules']} rules"
+            arrow = "->" if result["written"] else "== (unchanged)"
+            lines.append(f"ok     {label:<32} {result['seconds']:>8.3f}s  {count} {arrow} {result['output']}")
+        else:
+            lines.append(f"FAILED {label:<32} {result.get('seconds', 0):>8.3f}s  {result['error']}")
+    failed = sum(result["status"] != "ok" for result in results)
+    lines.append(f"{len(results) - failed}/{len(results)} jobs ok in {total_seconds:.3f}s")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build availability payloads and benefit rules for every tenant.")
+    parser.add_argument("manifest", type=Path, nargs="?", default=MANIFEST_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="run at most N jobs at once")
+    parser.add_argument("--only", action="append", metavar="SLUG", help="build only these slugs (repeatable)")
+    parser.add_argument("--no-snapshot", action="store_true", help="parse workbooks without memory-mapped snapshots")
+    parser.add_argument("--report", type=Path, nargs="?", const=REPORT_PATH, help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    jobs, problems = load_manifest(args.manifest)
+    if args.only:
+        unknown = set(args.only) - {slug for slug, _, _ in jobs}
+        problems.extend(f"{slug}: not in {args.manifest}" for slug in sorted(unknown))
+        jobs = [job for job in jobs if job[0] in args.only]
+    if problems:
+        for problem in problems:
+            print(f"ERROR {problem}")
+        raise SystemExit(1)
+
+    start = time.perf_counter()
+    results = run_batch(jobs, args.workers, None if args.no_snapshot else SNAPSHOT_DIR)
+    total_seconds = time.perf_counter() - start
+    print(format_batch_report(results, total_seconds))
+    for result in results:
+        if result.get("traceback"):
+            print(f"\n{result['slug']}/{result['kind']}:\n{result['traceback']}", end="")
+    if args.report:
+        report = {"workers": args.workers, "totalSeconds": round(total_seconds, 6), "jobs": results}
+        write_json(report, args.report, pretty=True)
+    if any(result["status"] != "ok" for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
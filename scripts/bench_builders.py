@@ -0,0 +1,215 @@
+import argparse
+import csv
+import json
+import platform
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+from build_metrics import StageTimer, peak_rss_mb
+from csv_reader import read_columns
+from json_output import write_json
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BASE_DIR / "scripts" / "benchmarks"
+DEFAULT_SHEETS = (10, 50, 100, 500)
+DEFAULT_ROWS = (1000, 10000, 100000)
+DEFAULT_LEADS = (10000, 100000)
+
+
+def bench_availability(sheet_count, programs_per_sheet):
+    from build_availability_from_xlsx import assemble_payload, build_entries, is_skipped_sheet, write_payload
+    from extract_plan_urls import collect_program_links, plan_url_rows, plan_urls_from_rows
+    from synthetic_portfolio import generate_portfolio
+    from xlsx_reader import XlsxWorkbook
+
+    timer = StageTimer()
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx_path = Path(tmp) / "portfolio.xlsx"
+        timer.run("generate", generate_portfolio, xlsx_path, sheet_count, programs_per_sheet)
+
+        def read_all():
+            with XlsxWorkbook(xlsx_path) as wb:
+                return list(wb.iter_sheets())
+
+        sheets = timer.run("read", read_all)
+
+        def links():
+            program_links = {}
+            for sheet in sheets:
+                collect_program_links(sheet, program_links)
+            return plan_urls_from_rows(plan_url_rows(program_links))
+
+        plan_url_by_program = timer.run("links", links)
+
+        def build():
+            availability = []
+            debug = []
+            for sheet in sheets:
+                if is_skipped_sheet(sheet.name):
+                    continue
+                entries = build_entries(sheet)
+                availability.extend(entries)
+                debug.append({"plantel": sheet.name, "entries": len(entries)})
+            return availability, debug
+
+        availability, debug = timer.run("build", build)
+        payload = timer.run("assemble", assemble_payload, availability, debug, plan_url_by_program)
+        # Compact and streamed, as the builder writes it.
+        written = timer.run("serialize", write_payload, payload, Path(tmp) / "availability_payload.json")
+        cell_count = sum(len(row) for sheet in sheets for row in sheet.rows)
+        row_count = sum(len(sheet.rows) for sheet in sheets)
+
+    wall = round(timer.total(exclude=("generate",)), 4)
+    return {
+        "builder": "availability",
+        "size": {"sheets": sheet_count, "programs_per_sheet": programs_per_sheet},
+        "rows": row_count,
+        "cells": cell_count,
+        "entries": len(payload["availability"]),
+        "output_bytes": written["bytes"],
+        "stages": timer.stages,
+        "wall_s": wall,
+        "throughput": {
+            "sheets_per_s": round(sheet_count / wall, 2) if wall else None,
+            "rows_per_s": round(row_count / wall, 1) if wall else None,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_benefit_rules(row_count):
+    from benefit_index import BenefitIndex
+    from build_benefit_rules_from_csvs import build_rules, compact_rules, write_rules
+    from synthetic_portfolio import generate_price_csvs
+
+    timer = StageTimer()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = timer.run("generate", generate_price_csvs, Path(tmp), row_count)
+        rules = timer.run("build", build_rules, *paths)
+        compacted = timer.run("compact", compact_rules, rules)
+        written = timer.run("serialize", write_rules, compacted, Path(tmp) / "benefit_rules.json")
+        index = timer.run("index", BenefitIndex.from_rules, compacted)
+        timer.run("write_index", write_json, index.to_json(), Path(tmp) / "benefit_rules_index.json")
+
+    wall = round(timer.total(exclude=("generate",)), 4)
+    input_rows = row_count * 3
+    return {
+        "builder": "benefit_rules",
+        "size": {"rows_per_csv": row_count},
+        "rows": input_rows,
+        "rules": len(rules),
+        "compacted_rules": len(compacted),
+        "output_bytes": written["bytes"],
+        "stages": timer.stages,
+        "wall_s": wall,
+        "throughput": {"rows_per_s": round(input_rows / wall, 1) if wall else None},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_quotes(lead_count):
+    from quote_engine import LEAD_FIELDS, QuoteEngine, sample_leads, write_quotes
+
+    timer = StageTimer()
+    with tempfile.TemporaryDirectory() as tmp:
+        leads_path = Path(tmp) / "leads.csv"
+        output_path = Path(tmp) / "quotes.csv"
+
+        def generate():
+            engine = QuoteEngine.load()
+            with leads_path.open("w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=LEAD_FIELDS)
+                writer.writeheader()
+                writer.writerows(sample_leads(engine.rules, engine.meta, lead_count))
+
+        timer.run("generate", generate)
+        engine = timer.run("load", QuoteEngine.load)
+        fieldnames, columns = timer.run("read", read_columns, leads_path)
+        quotes = timer.run("quote", engine.quote, columns)
+        timer.run("write", write_quotes, output_path, fieldnames, columns, quotes)
+        output_bytes = output_path.stat().st_size
+
+    wall = round(timer.total(exclude=("generate",)), 4)
+    return {
+        "builder": "quotes",
+        "size": {"leads": lead_count},
+        "rows": lead_count,
+        "output_bytes": output_bytes,
+        "stages": timer.stages,
+        "wall_s": wall,
+        "throughput": {"leads_per_s": round(lead_count / wall, 1) if wall else None},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(func, *args):
+    # A fresh interpreter per case keeps peak RSS from leaking between sizes.
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(func, *args).result()
+
+
+def case_key(result):
+    return result["builder"], json.dumps(result["size"], sort_keys=True)
+
+
+def compare(results, baseline_path: Path):
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    previous = {case_key(item): item for item in baseline.get("results", [])}
+    print(f"Compared with {baseline_path}:")
+    for result in results:
+        before = previous.get(case_key(result))
+        if not before or not before.get("wall_s"):
+            continue
+        ratio = result["wall_s"] / before["wall_s"]
+        print(f"  {result['builder']} {result['size']}: {before['wall_s']}s -> {result['wall_s']}s ({ratio:.2f}x)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the availability and benefit-rule builders and the quote engine on synthetic inputs.")
+    parser.add_argument("--sheets", type=int, nargs="*", default=list(DEFAULT_SHEETS), help="plantel sheet counts")
+    parser.add_argument("--programs-per-sheet", type=int, default=40)
+    parser.add_argument("--rows", type=int, nargs="*", default=list(DEFAULT_ROWS), help="rows per precios CSV")
+    parser.add_argument("--leads", type=int, nargs="*", default=list(DEFAULT_LEADS), help="leads per quote batch")
+    parser.add_argument("--output", type=Path, help="results JSON (default: scripts/benchmarks/<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier results JSON to compare wall times against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    for sheet_count in args.sheets:
+        result = run_isolated(bench_availability, sheet_count, args.programs_per_sheet)
+        print(f"availability sheets={sheet_count}: {result['wall_s']}s {result['stages']} rss={result['peak_rss_mb']}MB")
+        results.append(result)
+    for row_count in args.rows:
+        result = run_isolated(bench_benefit_rules, row_count)
+        print(f"benefit_rules rows={row_count}: {result['wall_s']}s {result['stages']} rss={result['peak_rss_mb']}MB")
+        results.append(result)
+    for lead_count in args.leads:
+        result = run_isolated(bench_quotes, lead_count)
+        print(f"quotes leads={lead_count}: {result['wall_s']}s {result['stages']} rss={result['peak_rss_mb']}MB")
+        results.append(result)
+
+    created_at = datetime.now(timezone.utc)
+    output = args.output or RESULTS_DIR / f"{created_at.strftime('%Y%m%dT%H%M%SZ')}.json"
+    write_json(
+        {
+            "created_at": created_at.isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        },
+        output,
+        pretty=True,
+    )
+    print(f"Wrote {len(results)} benchmark results to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
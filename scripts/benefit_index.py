@@ -0,0 +1,236 @@
+import argparse
+import itertools
+import json
+import random
+from pathlib import Path
+
+from json_output import write_json
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RULES_PATH = BASE_DIR / "scripts" / "benefit_rules.json"
+INDEX_PATH = BASE_DIR / "scripts" / "benefit_rules_index.json"
+INDEX_VERSION = 1
+# Lookup order of the nested index: linea -> modalidad -> plan -> plantel.
+DIMENSIONS = ("lineaNegocio", "modalidad", "plan", "plantel")
+WILDCARD = "*"
+
+
+def normalize_query_value(value) -> str:
+    # normalizeValue in src/utils/adminConfig.ts.
+    return str("" if value is None else value).strip().lower()
+
+
+def normalize_rule_value(value) -> str:
+    # normalizeAny in src/utils/adminConfig.ts: "todos" means any.
+    normalized = normalize_query_value(value)
+    return WILDCARD if normalized == "todos" else normalized
+
+
+def normalize_plan(plan) -> str:
+    # String(Number(plan)) for the integral plans the calculator passes.
+    try:
+        number = float(plan)
+    except (TypeError, ValueError):
+        return "nan"
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+def rule_planteles(rule):
+    planteles = rule.get("plantel")
+    if isinstance(planteles, list):
+        return planteles
+    if isinstance(planteles, str):
+        return [planteles]
+    return []
+
+
+def score_match(value: str, target: str) -> int:
+    if value == WILDCARD:
+        return 1
+    if value == target:
+        return 2
+    return -1
+
+
+def linear_resolve(rules, linea, plantel, modalidad, plan):
+    """Reference scan, equivalent to resolveDefaultBenefit."""
+    target = (
+        normalize_query_value(linea),
+        normalize_query_value(modalidad),
+        normalize_plan(plan),
+        normalize_query_value(plantel),
+    )
+    best = None
+    best_score = -1
+    for rule in rules:
+        plantel_score = max(
+            (score_match(normalize_rule_value(entry), target[3]) for entry in rule_planteles(rule)),
+            default=-1,
+        )
+        scores = (
+            score_match(normalize_rule_value(rule.get("lineaNegocio")), target[0]),
+            score_match(normalize_rule_value(rule.get("modalidad")), target[1]),
+            score_match(normalize_rule_value(rule.get("plan")), target[2]),
+            plantel_score,
+        )
+        if min(scores) < 0:
+            continue
+        total = sum(scores)
+        if total > best_score:
+            best_score = total
+            best = rule
+    return best
+
+
+class BenefitIndex:
+    """Benefit rules precompiled into nested linea/modalidad/plan/plantel maps.
+
+    Every combination of known values, plus ``"*"`` for "a value no rule names
+    explicitly", maps straight to the index of the rule resolveDefaultBenefit
+    would pick, so a lookup is four dict hits.
+    """
+
+    def __init__(self, rules, values, index):
+        self.rules = rules
+        self.values = values
+        self.index = index
+        self.domains = {name: set(values[name]) for name in DIMENSIONS}
+
+    @classmethod
+    def from_rules(cls, rules):
+        # Earliest rule for each exact (linea, modalidad, plan, plantel)
+        # pattern, where any component may be the wildcard.
+        earliest = {}
+        values = {name: set() for name in DIMENSIONS}
+        for rule_idx, rule in enumerate(rules):
+            attrs = [normalize_rule_value(rule.get(name)) for name in DIMENSIONS[:3]]
+            for plantel in rule_planteles(rule):
+                pattern = (*attrs, normalize_rule_value(plantel))
+                earliest.setdefault(pattern, rule_idx)
+                for name, value in zip(DIMENSIONS, pattern):
+                    if value != WILDCARD:
+                        values[name].add(value)
+
+        sorted_values = {name: sorted(values[name]) for name in DIMENSIONS}
+        index = {}
+        domains = [sorted_values[name] + [WILDCARD] for name in DIMENSIONS]
+        for key in itertools.product(*domains):
+            best_score = -1
+            best_idx = None
+            for choice in itertools.product((False, True), repeat=len(DIMENSIONS)):
+                # choice[i] picks the exact value (score 2) over the wildcard (1).
+                if any(use_exact and value == WILDCARD for use_exact, value in zip(choice, key)):
+                    continue
+                pattern = tuple(value if use_exact else WILDCARD for use_exact, value in zip(choice, key))
+                rule_idx = earliest.get(pattern)
+                if rule_idx is None:
+                    continue
+                score = sum(2 if use_exact else 1 for use_exact in choice)
+                if score > best_score or (score == best_score and rule_idx < best_idx):
+                    best_score = score
+                    best_idx = rule_idx
+            if best_idx is None:
+                continue
+            node = index
+            for value in key[:-1]:
+                node = node.setdefault(value, {})
+            node[key[-1]] = best_idx
+        return cls(rules, sorted_values, index)
+
+    @classmethod
+    def from_json(cls, data):
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported benefit index version: {data.get('version')!r}")
+        return cls(data["rules"], data["values"], data["index"])
+
+    @classmethod
+    def load(cls, path: Path):
+        return cls.from_json(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def to_json(self):
+        return {"version": INDEX_VERSION, "rules": self.rules, "values": self.values, "index": self.index}
+
+    def key_for(self, name, value):
+        return value if value in self.domains[name] else WILDCARD
+
+    def resolve_idx(self, linea, plantel, modalidad, plan):
+        node = self.index
+        for name, value in (
+            ("lineaNegocio", normalize_query_value(linea)),
+            ("modalidad", normalize_query_value(modalidad)),
+            ("plan", normalize_plan(plan)),
+            ("plantel", normalize_query_value(plantel)),
+        ):
+            node = node.get(self.key_for(name, value))
+            if node is None:
+                return None
+        return node
+
+    def resolve(self, linea, plantel, modalidad, plan):
+        rule_idx = self.resolve_idx(linea, plantel, modalidad, plan)
+        return None if rule_idx is None else self.rules[rule_idx]
+
+
+default_index = None
+
+
+def resolve_benefit(linea, plantel, modalidad, plan, index=None):
+    global default_index
+    if index is None:
+        if default_index is None:
+            default_index = BenefitIndex.load(INDEX_PATH)
+        index = default_index
+    return index.resolve(linea, plantel, modalidad, plan)
+
+
+def check_against_linear_scan(rules, samples=20000, seed=0):
+    # Property check: every known value (and unknown/cased/padded variants)
+    # must resolve to the same rule as the reference linear scan.
+    index = BenefitIndex.from_rules(rules)
+    rng = random.Random(seed)
+    pools = {name: list(index.values[name]) + ["zz-desconocido", "*", "todos"] for name in DIMENSIONS}
+    pools["plan"] += ["6", "9", "11", "4"]
+
+    def variant(value):
+        roll = rng.random()
+        if roll < 0.2:
+            return value.upper()
+        if roll < 0.3:
+            return f"  {value} "
+        return value
+
+    queries = list(itertools.product(pools["lineaNegocio"], pools["plantel"], pools["modalidad"], pools["plan"]))
+    if len(queries) > samples:
+        queries = rng.sample(queries, samples)
+    mismatches = []
+    for linea, plantel, modalidad, plan in queries:
+        query = (variant(linea), variant(plantel), variant(modalidad), plan)
+        expected = linear_resolve(rules, *query)
+        actual = index.resolve(*query)
+        if expected is not actual:
+            mismatches.append({"query": query, "expected": expected, "actual": actual})
+    return len(queries), mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or verify the precompiled benefit-rule index.")
+    parser.add_argument("--rules", type=Path, default=RULES_PATH)
+    parser.add_argument("--output", type=Path, default=INDEX_PATH)
+    parser.add_argument("--check", action="store_true", help="compare the index with a linear scan instead of writing it")
+    args = parser.parse_args(argv)
+
+    rules = json.loads(args.rules.read_text(encoding="utf-8")).get("rules", [])
+    if args.check:
+        checked, mismatches = check_against_linear_scan(rules)
+        for mismatch in mismatches[:10]:
+            print(f"MISMATCH {mismatch['query']}: {mismatch['expected']} != {mismatch['actual']}")
+        print(f"Checked {checked} lookups against a linear scan: {len(mismatches)} mismatches")
+        raise SystemExit(1 if mismatches else 0)
+
+    index = BenefitIndex.from_rules(rules)
+    write_json(index.to_json(), args.output)
+    print(f"Wrote benefit index for {len(rules)} rules to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
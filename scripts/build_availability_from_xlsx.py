@@ -1,42 +1,97 @@
-import csv
+import argparse
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-import openpyxl
+
+from availability_index import AvailabilityIndex
+from build_cache import (
+    builder_fingerprint,
+    diff_entries,
+    format_report,
+    load_cache,
+    save_cache,
+    sheet_fingerprint,
+)
+from build_metrics import NULL_TIMER, MemoryTracker, StageTimer, peak_rss_mb
+from extract_plan_urls import plan_urls_from_rows, read_plan_urls
+from json_output import write_json
+from normalization import normalize_program_key, normalize_text, to_title_case
+from payload_delta import PATCH_PATH, diff_payloads, patch_summary
+from payload_encoding import ENCODED_PATH, write_encoded_payload
+from payload_shards import SHARDS_DIR, write_shards
+from program_index import ProgramIndex, check_threshold
+from sheet_grid import GridRow, SheetGrid, next_after
+from sheets_reader import SHEET_ID, SHEETS_ENDPOINT, SheetsWorkbook
+from workbook_snapshot import SNAPSHOT_DIR, open_workbook
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 XLSX_PATH = Path(r"C:\Users\RicardoMartinezH\Downloads\OPP_ Portafolio C1 2026.xlsx")
 OUTPUT_PATH = BASE_DIR / "scripts" / "availability_payload.json"
 PLAN_URL_PATH = BASE_DIR / "scripts" / "programs_plan_urls.csv"
-
-
-def normalize_text(value: str) -> str:
-    return (
-        str(value or "")
-        .lower()
-        .encode("ascii", "ignore")
-        .decode("ascii")
-        .strip()
-    )
-
-
-def normalize_program_key(value: str) -> str:
-    normalized = normalize_text(value)
-    for prefix in (
-        "licenciatura en ",
-        "maestria en ",
-        "ingenieria en ",
-        "ingenieria ",
-        "licenciatura ",
-        "maestria ",
-    ):
-        if normalized.startswith(prefix):
-            normalized = normalized[len(prefix) :]
-            break
-    return " ".join(normalized.split()).strip()
-
-
-def to_title_case(value: str) -> str:
-    return " ".join(word[:1].upper() + word[1:].lower() for word in str(value).split())
+CACHE_PATH = BASE_DIR / "scripts" / ".availability_cache.json"
+PROFILE_PATH = BASE_DIR / "scripts" / "availability_payload.profile.json"
+FUZZY_PLAN_URL_THRESHOLD = 0.85
+BUILDER_SOURCES = (
+    "build_availability_from_xlsx.py",
+    "normalization.py",
+    "sheet_grid.py",
+    "sheets_reader.py",
+    "xlsx_reader.py",
+)
+
+ONLINE_ALLOWLIST = [
+    "Licenciatura en Administración de Empresas",
+    "Licenciatura en Administración de Empresas Turísticas",
+    "Licenciatura en Administración de Tecnologías de la Información",
+    "Licenciatura en Contaduría Pública",
+    "Licenciatura en Ciencias de la Comunicación",
+    "Licenciatura en Comercio Internacional",
+    "Licenciatura en Mercadotecnia",
+    "Licenciatura en Derecho",
+    "Licenciatura en Diseño Gráfico",
+    "Licenciatura en Arquitectura",
+    "Licenciatura en Pedagogía",
+    "Ingeniería Industrial y de Sistemas",
+    "Ingeniería en Manufactura y Robótica",
+    "Ingeniería en Sistemas Computacionales",
+    "Licenciatura en Relaciones Internacionales",
+    "Licenciatura en Negocios Internacionales",
+    "Licenciatura en Economía y Finanzas",
+    "Licenciatura en Administración Financiera",
+    "Licenciatura en Administración de Recursos Humanos",
+    "Ingeniería Industrial y Administración",
+    "Ingeniería en Software y Redes",
+    "Ingeniería en Logistica",
+    "Licenciatura en Seguridad Pública",
+    "Licenciatura en Criminología",
+    "Maestría en Administración de Negocios",
+    "Maestría en Administración Financiera",
+    "Maestría en Mercadotecnia",
+    "Maestría en Gestión de Talento Humano",
+    "Maestría en Gestión de Proyectos",
+    "Maestría en Derecho Constitucional y Amparo",
+    "Maestría en Derecho Corporativo",
+    "Maestría en Derecho Fiscal y Administrativo",
+    "Maestría en Derecho Laboral",
+    "Maestría en Derecho Procesal",
+    "Maestría en Derecho y Juicios Orales",
+    "Maestría en Educación y Docencia",
+    "Maestría en Gestión Educativa",
+    "Maestría en Administración de Servicios de Salud",
+    "Maestría en Administración de Negocios y Mercadotecnia",
+    "Maestría en Finanzas",
+    "Maestría en Administración Pública",
+    "Maestría en Diseño Digital",
+    "Maestría en Diseño Sostenible y Arquitectura Verde",
+    "Maestría en Diseño Estratégico e Innovación",
+    "Maestría en Robótica y Automatización",
+    "Maestría en Inteligencia Artificial",
+    "Maestría en Energías Renovables",
+    "Maestría en Interacción y Experiencia del Usuario",
+    "Maestría en Logística y Cadena de Suministro",
+]
 
 
 def parse_availability(raw) -> bool:
@@ -55,34 +110,18 @@ def parse_availability(raw) -> bool:
     return False
 
 
-def extract_links(sheet):
-    links_by_row = {}
-    links_by_cell = {}
-    hidden_rows = set()
-    for row in sheet.iter_rows():
-        row_idx = row[0].row - 1
-        if sheet.row_dimensions[row[0].row].hidden:
-            hidden_rows.add(row_idx)
-        for cell in row:
-            if cell.hyperlink and cell.hyperlink.target:
-                links_by_cell[(row_idx, cell.column - 1)] = cell.hyperlink.target
-                links_by_row.setdefault(row_idx, cell.hyperlink.target)
-    return links_by_row, links_by_cell, hidden_rows
-
-
-def build_online_availability(rows, sheet_name, links_by_row, links_by_cell, hidden_rows):
+def build_online_availability(rows, sheet_name, links_by_row, links_by_cell, hidden_rows, grid=None):
+    grid = grid or SheetGrid(rows)
     header_matches = []
-    for r_idx, row in enumerate(rows):
-        for c_idx, cell in enumerate(row):
-            normalized = normalize_text(cell)
-            if not normalized or "online" not in normalized:
-                continue
-            if "licenciatura" in normalized:
-                header_matches.append((r_idx, c_idx, "licenciatura online"))
-            elif "posgrados" in normalized or "maestria" in normalized:
-                header_matches.append((r_idx, c_idx, "posgrados online"))
+    for r_idx, c_idx in grid.cells("online"):
+        normalized = grid.normalized[r_idx][c_idx]
+        if "licenciatura" in normalized:
+            header_matches.append((r_idx, c_idx, "licenciatura online"))
+        elif "posgrados" in normalized or "maestria" in normalized:
+            header_matches.append((r_idx, c_idx, "posgrados online"))
 
     header_matches.sort()
+    header_rows = [h[0] for h in header_matches]
     lic_headers = [h for h in header_matches if h[2] == "licenciatura online"]
     pos_headers = [h for h in header_matches if h[2] == "posgrados online"]
     pos_start = min([h[0] for h in pos_headers], default=None)
@@ -94,11 +133,7 @@ def build_online_availability(rows, sheet_name, links_by_row, links_by_cell, hid
 
     def parse_headers(headers, end_override=None):
         for row_idx, col_idx, label in headers:
-            next_row = None
-            for h in header_matches:
-                if h[0] > row_idx:
-                    next_row = h[0]
-                    break
+            next_row = next_after(header_rows, row_idx)
             end_row = next_row if next_row is not None else len(rows)
             if end_override is not None:
                 end_row = min(end_row, end_override)
@@ -131,38 +166,35 @@ def build_online_availability(rows, sheet_name, links_by_row, links_by_cell, hid
     return entries
 
 
-def build_sheet_availability(rows, sheet_name, links_by_row, links_by_cell, hidden_rows):
-    normalized_rows = [[str(cell or "") for cell in row] for row in rows]
-    header_idx = -1
-    for idx, row in enumerate(normalized_rows):
-        has_c1 = any("c1" in normalize_text(cell) for cell in row)
-        has_2026 = any("2026" in normalize_text(cell) for cell in row)
-        if has_c1 and has_2026:
-            header_idx = idx
-            break
+def build_sheet_availability(rows, sheet_name, links_by_row, links_by_cell, hidden_rows, grid=None):
+    grid = grid or SheetGrid(rows)
+    normalized_rows = grid.text
+    rows_2026 = set(grid.token_rows("2026"))
+    header_idx = next((idx for idx in grid.token_rows("c1") if idx in rows_2026), -1)
     if header_idx < 0:
         return []
 
-    year_idx = header_idx
-    for idx in range(header_idx, min(header_idx + 6, len(normalized_rows))):
-        if any(normalize_text(cell) == "2026" for cell in normalized_rows[idx]):
-            year_idx = idx
-            break
-
-    modalidad_idx = -1
-    for idx in range(year_idx, min(year_idx + 4, len(normalized_rows))):
-        if any("escolarizado" in normalize_text(cell) or "ejecutivo" in normalize_text(cell) for cell in normalized_rows[idx]):
-            modalidad_idx = idx
-            break
+    year_idx = grid.first_row("2026", header_idx, header_idx + 6, exact=True)
+    if year_idx < 0:
+        year_idx = header_idx
+
+    modalidad_candidates = [
+        idx
+        for idx in (
+            grid.first_row("escolarizado", year_idx, year_idx + 4),
+            grid.first_row("ejecutivo", year_idx, year_idx + 4),
+        )
+        if idx >= 0
+    ]
+    modalidad_idx = min(modalidad_candidates) if modalidad_candidates else -1
     if modalidad_idx < 0:
         modalidad_idx = min(year_idx + 1, len(normalized_rows) - 1)
 
-    modalidad_row = normalized_rows[modalidad_idx]
-    escolarizado_cols = [i for i, cell in enumerate(modalidad_row) if "escolarizado" in normalize_text(cell)]
-    ejecutivo_cols = [i for i, cell in enumerate(modalidad_row) if "ejecutivo" in normalize_text(cell)]
+    escolarizado_cols = grid.row_cols("escolarizado", modalidad_idx)
+    ejecutivo_cols = grid.row_cols("ejecutivo", modalidad_idx)
 
-    header_row = normalized_rows[header_idx]
-    horarios_header_col = next((i for i, cell in enumerate(header_row) if normalize_text(cell) == "horarios"), -1)
+    horarios_header_cols = grid.row_cols("horarios", header_idx, exact=True)
+    horarios_header_col = horarios_header_cols[0] if horarios_header_cols else -1
     availability_escolarizado_cols = [c for c in escolarizado_cols if c < horarios_header_col] if horarios_header_col >= 0 else escolarizado_cols
     availability_ejecutivo_cols = [c for c in ejecutivo_cols if c < horarios_header_col] if horarios_header_col >= 0 else ejecutivo_cols
 
@@ -178,7 +210,7 @@ def build_sheet_availability(rows, sheet_name, links_by_row, links_by_cell, hidd
     schedule_escolarizado_fallback = schedule_escolarizado_col if schedule_escolarizado_col >= 0 else 7
     schedule_ejecutivo_fallback = schedule_ejecutivo_col if schedule_ejecutivo_col >= 0 else 8
 
-    horarios_idx = next((i for i, row in enumerate(normalized_rows) if any(normalize_text(cell) == "horarios" for cell in row)), -1)
+    horarios_idx = grid.first_row("horarios", exact=True)
     end_idx = horarios_idx if horarios_idx > modalidad_idx else len(normalized_rows)
 
     entries = []
@@ -186,10 +218,11 @@ def build_sheet_availability(rows, sheet_name, links_by_row, links_by_cell, hidd
         real_idx = modalidad_idx + 1 + offset
         if real_idx in hidden_rows:
             continue
-        programa = (row[1] if len(row) > 1 and row[1].strip() else (row[0] if row else "")).strip()
+        program_col = 1 if len(row) > 1 and row[1].strip() else 0
+        programa = (row[program_col] if row else "").strip()
         if not programa:
             continue
-        programa_norm = normalize_text(programa)
+        programa_norm = grid.normalized[real_idx][program_col]
         if programa_norm in ("modular", "longitudinal", "programa", "programas"):
             continue
         escolarizado_activo = parse_availability(row[escolarizado_col] if escolarizado_col >= 0 else "")
@@ -197,7 +230,6 @@ def build_sheet_availability(rows, sheet_name, links_by_row, links_by_cell, hidd
         if not escolarizado_activo and not ejecutivo_activo:
             continue
 
-        program_col = 1 if len(row) > 1 and row[1].strip() else 0
         plan_url = links_by_cell.get((real_idx, program_col)) or links_by_row.get(real_idx, "")
 
         if escolarizado_activo:
@@ -229,119 +261,465 @@ def build_sheet_availability(rows, sheet_name, links_by_row, links_by_cell, hidd
     return entries
 
 
-def main():
-    wb = openpyxl.load_workbook(XLSX_PATH, data_only=True)
-    availability = []
-    debug = []
-    plan_url_by_program = {}
-
-    if PLAN_URL_PATH.exists():
-        with PLAN_URL_PATH.open("r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                program = row.get("programa", "")
-                url = row.get("plan_url", "")
-                key = normalize_program_key(program)
-                if not key or not url:
-                    continue
-                if key in plan_url_by_program:
-                    continue
-                plan_url_by_program[key] = url
+# Rows the header block may span past the "C1 2026" row: the year row is at
+# most 5 rows below it and the modalidad row at most 3 below that.
+HEADER_LOOKAHEAD = 9
+
 
-    for sheet_name in wb.sheetnames:
-        sheet = wb[sheet_name]
-        rows = [[cell.value for cell in row] for row in sheet.iter_rows(values_only=False)]
-        links_by_row, links_by_cell, hidden_rows = extract_links(sheet)
+def resolve_plan_urls(pending, links_by_row, links_by_cell):
+    # Streamed sheets only know their links once every row has been read.
+    for entry, r_idx, c_idx in pending:
+        entry["planUrl"] = links_by_cell.get((r_idx, c_idx)) or links_by_row.get(r_idx, "")
 
-        if normalize_text(sheet_name) == "oferta general":
+
+def stream_online_availability(stream):
+    """build_online_availability over a SheetStream, one row at a time."""
+    # A header row closes the sections opened by the previous one; once a
+    # posgrados header is seen, licenciatura sections stop producing entries.
+    sections = {}
+    active = []
+    posgrados_seen = False
+    pending = []
+    for r_idx, values, hidden in stream:
+        row = GridRow(values)
+        headers = []
+        for c_idx in row.cols("online"):
+            normalized = row.normalized[c_idx]
+            if "licenciatura" in normalized:
+                headers.append((r_idx, c_idx, "licenciatura online"))
+            elif "posgrados" in normalized or "maestria" in normalized:
+                headers.append((r_idx, c_idx, "posgrados online"))
+        if headers:
+            active = headers
+            for header in headers:
+                sections[header] = []
+            posgrados_seen = posgrados_seen or any(label == "posgrados online" for _, _, label in headers)
             continue
-        if "online" in normalize_text(sheet_name):
-            entries = build_online_availability(rows, sheet_name, links_by_row, links_by_cell, hidden_rows)
+        if hidden:
+            continue
+        for header in active:
+            _, col_idx, label = header
+            if label == "licenciatura online" and posgrados_seen:
+                continue
+            programa = to_title_case(row.cell(col_idx).strip())
+            if not programa:
+                continue
+            normalized = normalize_text(programa)
+            if "online" in normalized and ("licenciatura" in normalized or "posgrados" in normalized):
+                continue
+            if normalized in ("programa", "programas"):
+                continue
+            entry = {
+                "id": f"sheet-{stream.name}-{label}-{r_idx}-{col_idx}-online",
+                "plantel": stream.name,
+                "programa": programa,
+                "modalidad": "online",
+                "horario": "",
+                "planUrl": "",
+                "activo": True,
+            }
+            sections[header].append(entry)
+            pending.append((entry, r_idx, col_idx))
+    resolve_plan_urls(pending, stream.links_by_row, stream.links_by_cell)
+    entries = []
+    for label in ("licenciatura online", "posgrados online"):
+        for header, section in sections.items():
+            if header[2] == label:
+                entries.extend(section)
+    return entries
+
+
+def stream_sheet_availability(stream):
+    """build_sheet_availability over a SheetStream.
+
+    Only the header block is buffered (HEADER_LOOKAHEAD rows past the header
+    row); program rows are handled as they arrive until the Horarios section.
+    """
+    rows = iter(stream)
+    horarios_before = False
+    header = None
+    for r_idx, values, hidden in rows:
+        row = GridRow(values)
+        if row.has("c1") and row.has("2026"):
+            header = (r_idx, row, hidden)
+            break
+        horarios_before = horarios_before or row.has("horarios", exact=True)
+    if header is None:
+        return []
+
+    header_idx = header[0]
+    window = [header]
+    for r_idx, values, hidden in rows:
+        window.append((r_idx, GridRow(values), hidden))
+        if r_idx >= header_idx + HEADER_LOOKAHEAD:
+            break
+
+    def first_row(token, start, stop, exact=False):
+        return next((r_idx for r_idx, row, _ in window if start <= r_idx < stop and row.has(token, exact)), -1)
+
+    def window_row(r_idx):
+        return next((row for idx, row, _ in window if idx == r_idx), GridRow(()))
+
+    year_idx = first_row("2026", header_idx, header_idx + 6, exact=True)
+    if year_idx < 0:
+        year_idx = header_idx
+
+    modalidad_candidates = [
+        idx
+        for idx in (
+            first_row("escolarizado", year_idx, year_idx + 4),
+            first_row("ejecutivo", year_idx, year_idx + 4),
+        )
+        if idx >= 0
+    ]
+    # Past the last row nothing follows, as with the full-sheet fallback.
+    modalidad_idx = min(modalidad_candidates) if modalidad_candidates else year_idx + 1
+
+    modalidad_row = window_row(modalidad_idx)
+    escolarizado_cols = modalidad_row.cols("escolarizado")
+    ejecutivo_cols = modalidad_row.cols("ejecutivo")
+
+    horarios_header_cols = header[1].cols("horarios", exact=True)
+    horarios_header_col = horarios_header_cols[0] if horarios_header_cols else -1
+    availability_escolarizado_cols = [c for c in escolarizado_cols if c < horarios_header_col] if horarios_header_col >= 0 else escolarizado_cols
+    availability_ejecutivo_cols = [c for c in ejecutivo_cols if c < horarios_header_col] if horarios_header_col >= 0 else ejecutivo_cols
+
+    escolarizado_col = availability_escolarizado_cols[0] if availability_escolarizado_cols else (escolarizado_cols[0] if escolarizado_cols else -1)
+    ejecutivo_col = availability_ejecutivo_cols[0] if availability_ejecutivo_cols else (ejecutivo_cols[0] if ejecutivo_cols else -1)
+    if escolarizado_col < 0:
+        escolarizado_col = 2
+    if ejecutivo_col < 0:
+        ejecutivo_col = 3
+
+    schedule_escolarizado_col = next((c for c in escolarizado_cols if c > horarios_header_col), -1) if horarios_header_col >= 0 else -1
+    schedule_ejecutivo_col = next((c for c in ejecutivo_cols if c > horarios_header_col), -1) if horarios_header_col >= 0 else -1
+    schedule_escolarizado_fallback = schedule_escolarizado_col if schedule_escolarizado_col >= 0 else 7
+    schedule_ejecutivo_fallback = schedule_ejecutivo_col if schedule_ejecutivo_col >= 0 else 8
+
+    # The first exact "Horarios" row ends the program rows only when it comes
+    # after the modalidad row (the header row usually has one too).
+    horarios_before = horarios_before or any(
+        row.has("horarios", exact=True) for r_idx, row, _ in window if r_idx <= modalidad_idx
+    )
+
+    def program_rows():
+        for r_idx, row, hidden in window:
+            if r_idx > modalidad_idx:
+                yield r_idx, row, hidden
+        for r_idx, values, hidden in rows:
+            yield r_idx, GridRow(values), hidden
+
+    entries = []
+    pending = []
+    for real_idx, row, hidden in program_rows():
+        if not horarios_before and row.has("horarios", exact=True):
+            break
+        if hidden:
+            continue
+        offset = real_idx - modalidad_idx - 1
+        program_col = 1 if row.cell(1).strip() else 0
+        programa = row.cell(program_col).strip()
+        if not programa:
+            continue
+        programa_norm = row.normalized[program_col]
+        if programa_norm in ("modular", "longitudinal", "programa", "programas"):
+            continue
+        escolarizado_activo = parse_availability(row.cell(escolarizado_col))
+        ejecutivo_activo = parse_availability(row.cell(ejecutivo_col))
+        if not escolarizado_activo and not ejecutivo_activo:
+            continue
+
+        for activo, modalidad, suffix, schedule_col in (
+            (escolarizado_activo, "presencial", "presencial", schedule_escolarizado_fallback),
+            (ejecutivo_activo, "mixta", "mixta", schedule_ejecutivo_fallback),
+        ):
+            if not activo:
+                continue
+            entry = {
+                "id": f"sheet-{stream.name}-{offset}-{suffix}",
+                "plantel": stream.name,
+                "programa": to_title_case(programa),
+                "modalidad": modalidad,
+                "horario": row.cell(schedule_col).strip(),
+                "planUrl": "",
+                "activo": True,
+            }
+            entries.append(entry)
+            pending.append((entry, real_idx, program_col))
+    # Drain the rest of the sheet so its hyperlinks are read.
+    for _ in rows:
+        pass
+    resolve_plan_urls(pending, stream.links_by_row, stream.links_by_cell)
+    return entries
+
+
+def is_skipped_sheet(sheet_name: str) -> bool:
+    return normalize_text(sheet_name) == "oferta general"
+
+
+def build_entries(sheet, timer=NULL_TIMER):
+    # "index" is normalization plus header/section token indexing; "entries"
+    # is the header lookup and row walk that produces availability entries.
+    grid = timer.run("index", SheetGrid, sheet.rows)
+    builder = build_online_availability if "online" in normalize_text(sheet.name) else build_sheet_availability
+    with timer.stage("entries"):
+        return builder(sheet.rows, sheet.name, sheet.links_by_row, sheet.links_by_cell, sheet.hidden_rows, grid)
+
+
+def stream_entries(stream, timer=NULL_TIMER):
+    builder = stream_online_availability if "online" in normalize_text(stream.name) else stream_sheet_availability
+    # Reading is interleaved with the row walk, so it is a single stage.
+    return timer.run("stream", builder, stream)
+
+
+def sheet_metrics(sheet, timer, memory, cached):
+    return {
+        "cached": cached,
+        "rows": len(sheet.rows),
+        "cells": sum(len(row) for row in sheet.rows),
+        "hiddenRows": len(sheet.hidden_rows),
+        "links": len(sheet.links_by_cell),
+        "stages": dict(timer.stages),
+        "totalSeconds": timer.total(),
+        "rssGrowthMb": memory.growth_mb(),
+    }
+
+
+# Workbooks opened inside pool workers, kept for the life of the process so
+# shared strings and styles are parsed once per worker rather than per sheet.
+# Keyed by pid so forked workers never share the parent's zip handle, and
+# reopened when the file on disk changes.
+worker_workbooks = {}
+
+
+def is_open_workbook(source) -> bool:
+    # Sources are xlsx paths, or workbooks already in memory (SheetsWorkbook).
+    return not isinstance(source, (str, os.PathLike))
+
+
+def open_worker_workbook(xlsx_path, snapshot_dir=SNAPSHOT_DIR):
+    if is_open_workbook(xlsx_path):
+        return xlsx_path
+    stat = os.stat(xlsx_path)
+    key = (os.getpid(), str(xlsx_path), str(snapshot_dir))
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = worker_workbooks.get(key)
+    if cached is None or cached[0] != version:
+        if cached is not None:
+            cached[1].close()
+        cached = worker_workbooks[key] = (version, open_workbook(xlsx_path, snapshot_dir))
+    return cached[1]
+
+
+def map_sheets(task, xlsx_path, sheet_names, *extra_args, workers=1):
+    # pool.map yields results in submission order, so merging them keeps the
+    # serial sheet order (and therefore ids/debug order) regardless of workers.
+    if workers <= 1 or len(sheet_names) <= 1:
+        return [task(xlsx_path, name, *args) for name, *args in zip(sheet_names, *extra_args)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(sheet_names))) as pool:
+        return list(pool.map(task, repeat(xlsx_path), sheet_names, *extra_args))
+
+
+def load_sheet_entries(xlsx_path, sheet_name, cached_hash=None, profile=False, snapshot_dir=SNAPSHOT_DIR):
+    # Returns (sheet hash, entries, metrics); entries is None when the hash
+    # matches the cache and metrics is None unless profiling.
+    timer = StageTimer() if profile else NULL_TIMER
+    memory = MemoryTracker() if profile else None
+    if memory:
+        memory.start()
+    # "read" covers XML parsing together with hyperlink/hidden-row extraction.
+    sheet = timer.run("read", open_worker_workbook(xlsx_path, snapshot_dir).read_sheet, sheet_name)
+    digest = timer.run("hash", sheet_fingerprint, sheet) if cached_hash is not None else None
+    entries = None
+    if digest is None or digest != cached_hash:
+        entries = build_entries(sheet, timer)
+    metrics = sheet_metrics(sheet, timer, memory, entries is None) if profile else None
+    return digest, entries, metrics
+
+
+def stream_sheet_entries(xlsx_path, sheet_name, profile=False):
+    # Same (hash, entries, metrics) shape as load_sheet_entries, never cached.
+    timer = StageTimer() if profile else NULL_TIMER
+    memory = MemoryTracker() if profile else None
+    if memory:
+        memory.start()
+    stream = open_worker_workbook(xlsx_path, None).stream_sheet(sheet_name)
+    entries = stream_entries(stream, timer)
+    metrics = None
+    if profile:
+        metrics = {
+            "cached": False,
+            "rows": stream.row_count,
+            "cells": stream.cell_count,
+            "hiddenRows": stream.hidden_count,
+            "links": len(stream.links_by_cell),
+            "stages": dict(timer.stages),
+            "totalSeconds": timer.total(),
+            "rssGrowthMb": memory.growth_mb(),
+        }
+    return None, entries, metrics
+
+
+def collect_availability(
+    xlsx_path, workers=1, cache_path=None, profile=False, timer=NULL_TIMER, snapshot_dir=SNAPSHOT_DIR, stream=False
+):
+    if stream:
+        # Streamed sheets are never held whole: there is no sheet hash to
+        # cache by, and a snapshot would hold the whole workbook.
+        cache_path = None
+        snapshot_dir = None
+    if is_open_workbook(xlsx_path):
+        # Already in this process; shipping it to workers would cost more
+        # than building its sheets here.
+        workers = 1
+        sheet_names = [name for name in xlsx_path.sheetnames if not is_skipped_sheet(name)]
+    else:
+        # With a snapshot dir, this first open also (re)builds the snapshot, so
+        # worker processes only ever map the finished file.
+        with timer.stage("workbook_load"):
+            with open_workbook(xlsx_path, snapshot_dir) as wb:
+                sheet_names = [name for name in wb.sheetnames if not is_skipped_sheet(name)]
+
+    fingerprint = builder_fingerprint(BUILDER_SOURCES) if cache_path else None
+    cached = load_cache(cache_path, fingerprint) if cache_path else {}
+    if cache_path:
+        # "" never matches a real hash but still asks the worker to compute one.
+        cached_hashes = [cached[name]["hash"] if name in cached else "" for name in sheet_names]
+    else:
+        cached_hashes = [None] * len(sheet_names)
+
+    availability = []
+    debug = []
+    report = []
+    next_cache = {}
+    with timer.stage("sheets"):
+        if stream:
+            results = map_sheets(
+                stream_sheet_entries, xlsx_path, sheet_names, [profile] * len(sheet_names), workers=workers
+            )
         else:
-            entries = build_sheet_availability(rows, sheet_name, links_by_row, links_by_cell, hidden_rows)
+            results = map_sheets(
+                load_sheet_entries,
+                xlsx_path,
+                sheet_names,
+                cached_hashes,
+                [profile] * len(sheet_names),
+                [snapshot_dir] * len(sheet_names),
+                workers=workers,
+            )
+    for sheet_name, (digest, entries, metrics) in zip(sheet_names, results):
+        previous = cached.get(sheet_name)
+        if entries is None:
+            entries = previous["entries"]
+            report.append({"plantel": sheet_name, "status": "unchanged", "added": [], "removed": [], "changed": []})
+        elif cache_path:
+            status = "changed" if previous else "new"
+            changes = diff_entries(previous["entries"] if previous else [], entries)
+            report.append({"plantel": sheet_name, "status": status, **changes})
+        if cache_path:
+            next_cache[sheet_name] = {"hash": digest, "entries": entries}
         availability.extend(entries)
         debug.append({"plantel": sheet_name, "entries": len(entries)})
-
-    # plan URL fallback for online (from planteles if needed)
-    for entry in availability:
-        if entry["modalidad"] == "online":
+        if metrics:
+            debug[-1]["metrics"] = metrics
+
+    if cache_path:
+        for sheet_name, previous in cached.items():
+            if sheet_name not in next_cache:
+                removed = [entry["id"] for entry in previous["entries"]]
+                report.append({"plantel": sheet_name, "status": "removed", "added": [], "removed": removed, "changed": []})
+        # Saved before assemble_payload, which fills online plan URLs in place.
+        save_cache(cache_path, fingerprint, next_cache)
+    return availability, debug, report if cache_path else None
+
+
+def assemble_payload(
+    availability,
+    debug,
+    plan_url_by_program,
+    allowlist=ONLINE_ALLOWLIST,
+    timer=NULL_TIMER,
+    fuzzy_threshold=FUZZY_PLAN_URL_THRESHOLD,
+):
+    index = timer.run("index", AvailabilityIndex, availability)
+    with timer.stage("plan_url_fallback"):
+        plan_url_by_program = fill_online_plan_urls(availability, plan_url_by_program, index)
+    with timer.stage("allowlist_dedupe"):
+        payload = dedupe_online(availability, debug, plan_url_by_program, allowlist, index)
+    if fuzzy_threshold is not None:
+        with timer.stage("plan_url_fuzzy"):
+            fill_fuzzy_plan_urls(payload, plan_url_by_program, fuzzy_threshold)
+    return payload
+
+
+def fill_online_plan_urls(availability, plan_url_by_program, index=None):
+    # ``index`` is an AvailabilityIndex over ``availability``; only plan URLs
+    # change here, so it stays valid for dedupe_online.
+    index = index or AvailabilityIndex(availability)
+    plan_url_by_program = dict(plan_url_by_program)
+
+    # plan URL fallback for online (from planteles if needed): the first
+    # non-online entry with a plan URL for each program key
+    fallback = []
+    for key, positions in index.by_program.items():
+        if not key or key in plan_url_by_program:
+            continue
+        for position in positions:
+            entry = availability[position]
+            if entry["modalidad"] != "online" and entry.get("planUrl"):
+                fallback.append((position, key, entry["planUrl"]))
+                break
+    # In entry order: ProgramIndex breaks fuzzy ties by insertion order.
+    for _, key, plan_url in sorted(fallback):
+        plan_url_by_program[key] = plan_url
+
+    for key, plan_url in plan_url_by_program.items():
+        for position in index.match(program_key=key, modalidad_key="online"):
+            entry = availability[position]
+            if not entry.get("planUrl"):
+                entry["planUrl"] = plan_url
+    return plan_url_by_program
+
+
+def fill_fuzzy_plan_urls(payload, plan_url_by_program, threshold=FUZZY_PLAN_URL_THRESHOLD):
+    # Online entries still without a plan URL take the closest known program
+    # key, if any reaches the threshold; every such match is listed in debug.
+    # Presencial and mixta entries never get plan URLs by program key, so a
+    # near miss must not give them one either.
+    index = ProgramIndex(plan_url_by_program)
+    best_by_key = {}
+    matches = []
+    for entry in payload["availability"]:
+        if entry["modalidad"] != "online" or entry.get("planUrl"):
             continue
         key = normalize_program_key(entry["programa"])
-        if entry.get("planUrl") and key and key not in plan_url_by_program:
-            plan_url_by_program[key] = entry["planUrl"]
-
-    for entry in availability:
-        if entry["modalidad"] != "online":
+        if not key:
             continue
-        if entry.get("planUrl"):
+        if key not in best_by_key:
+            best_by_key[key] = index.best(key, threshold)
+        best = best_by_key[key]
+        if best is None:
             continue
-        key = normalize_program_key(entry["programa"])
-        if key in plan_url_by_program:
-            entry["planUrl"] = plan_url_by_program[key]
-
-    allowlist = [
-        "Licenciatura en Administración de Empresas",
-        "Licenciatura en Administración de Empresas Turísticas",
-        "Licenciatura en Administración de Tecnologías de la Información",
-        "Licenciatura en Contaduría Pública",
-        "Licenciatura en Ciencias de la Comunicación",
-        "Licenciatura en Comercio Internacional",
-        "Licenciatura en Mercadotecnia",
-        "Licenciatura en Derecho",
-        "Licenciatura en Diseño Gráfico",
-        "Licenciatura en Arquitectura",
-        "Licenciatura en Pedagogía",
-        "Ingeniería Industrial y de Sistemas",
-        "Ingeniería en Manufactura y Robótica",
-        "Ingeniería en Sistemas Computacionales",
-        "Licenciatura en Relaciones Internacionales",
-        "Licenciatura en Negocios Internacionales",
-        "Licenciatura en Economía y Finanzas",
-        "Licenciatura en Administración Financiera",
-        "Licenciatura en Administración de Recursos Humanos",
-        "Ingeniería Industrial y Administración",
-        "Ingeniería en Software y Redes",
-        "Ingeniería en Logistica",
-        "Licenciatura en Seguridad Pública",
-        "Licenciatura en Criminología",
-        "Maestría en Administración de Negocios",
-        "Maestría en Administración Financiera",
-        "Maestría en Mercadotecnia",
-        "Maestría en Gestión de Talento Humano",
-        "Maestría en Gestión de Proyectos",
-        "Maestría en Derecho Constitucional y Amparo",
-        "Maestría en Derecho Corporativo",
-        "Maestría en Derecho Fiscal y Administrativo",
-        "Maestría en Derecho Laboral",
-        "Maestría en Derecho Procesal",
-        "Maestría en Derecho y Juicios Orales",
-        "Maestría en Educación y Docencia",
-        "Maestría en Gestión Educativa",
-        "Maestría en Administración de Servicios de Salud",
-        "Maestría en Administración de Negocios y Mercadotecnia",
-        "Maestría en Finanzas",
-        "Maestría en Administración Pública",
-        "Maestría en Diseño Digital",
-        "Maestría en Diseño Sostenible y Arquitectura Verde",
-        "Maestría en Diseño Estratégico e Innovación",
-        "Maestría en Robótica y Automatización",
-        "Maestría en Inteligencia Artificial",
-        "Maestría en Energías Renovables",
-        "Maestría en Interacción y Experiencia del Usuario",
-        "Maestría en Logística y Cadena de Suministro",
-    ]
+        score, match = best
+        entry["planUrl"] = plan_url_by_program[match]
+        matches.append({"id": entry["id"], "programa": entry["programa"], "match": match, "score": score})
+    if matches:
+        # A new list: the per-sheet debug list stays as collect_availability built it.
+        payload["debug"] = [*payload["debug"], {"plantel": "planUrl", "fuzzyMatches": matches}]
+    return matches
+
+
+def dedupe_online(availability, debug, plan_url_by_program, allowlist=ONLINE_ALLOWLIST, index=None):
+    index = index or AvailabilityIndex(availability)
     allowlist_keys = {normalize_program_key(programa) for programa in allowlist}
+    online_by_key = {key: index.match(program_key=key, modalidad_key="online") for key in allowlist_keys}
 
+    online = set(index.match(modalidad_key="online"))
+    non_online = [entry for position, entry in enumerate(availability) if position not in online]
     deduped = {}
-    non_online = []
-    for entry in availability:
-        if entry["modalidad"] != "online":
-            non_online.append(entry)
-            continue
-        program_key = normalize_program_key(entry["programa"])
-        if program_key not in allowlist_keys:
-            continue
-        key = f"{program_key}::online::{normalize_text(entry['plantel'])}"
+    for position in sorted(position for positions in online_by_key.values() for position in positions):
+        entry = availability[position]
+        key = f"{normalize_program_key(entry['programa'])}::online::{normalize_text(entry['plantel'])}"
         current = deduped.get(key)
         if not current:
             deduped[key] = entry
@@ -352,10 +730,9 @@ def main():
         if not current.get("horario") and entry.get("horario"):
             deduped[key] = entry
 
-    online_keys = {normalize_program_key(entry["programa"]) for entry in deduped.values()}
     for programa in allowlist:
         key = normalize_program_key(programa)
-        if key in online_keys:
+        if online_by_key[key]:
             continue
         deduped[key + "::online::online"] = {
             "id": f"online-allowlist-{key}",
@@ -367,9 +744,157 @@ def main():
             "activo": True,
         }
 
-    payload = {"availability": non_online + list(deduped.values()), "debug": debug}
-    OUTPUT_PATH.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
-    print(f"Wrote {len(availability)} entries to {OUTPUT_PATH}")
+    return {"availability": non_online + list(deduped.values()), "debug": debug}
+
+
+def write_payload(payload, path: Path, pretty=False):
+    return write_json(payload, path, pretty)
+
+
+def fuzzy_threshold(value: str) -> float:
+    try:
+        return check_threshold(float(value))
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build availability_payload.json from the portfolio workbook.")
+    parser.add_argument("--workers", type=int, default=1, help="process sheets on N worker processes")
+    parser.add_argument("--no-cache", action="store_true", help="rebuild every sheet and skip the sheet cache")
+    parser.add_argument(
+        "--no-snapshot", action="store_true", help="parse the xlsx directly instead of its memory-mapped snapshot"
+    )
+    parser.add_argument(
+        "--source",
+        choices=("xlsx", "sheets"),
+        default="xlsx",
+        help="read the downloaded workbook, or fetch the Google Sheet directly in one request",
+    )
+    parser.add_argument("--sheet-id", default=SHEET_ID, help="spreadsheet id for --source sheets")
+    parser.add_argument(
+        "--sheets-endpoint",
+        default=SHEETS_ENDPOINT,
+        help="Sheets API base URL, e.g. a local stand-in from sheets_reader.py serve",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="read each sheet row by row with bounded look-ahead (implies --no-cache and --no-snapshot)",
+    )
+    parser.add_argument("--pretty", action="store_true", help="indent availability_payload.json for reading")
+    parser.add_argument("--report", type=Path, help="write the per-plantel change report as JSON")
+    parser.add_argument(
+        "--fuzzy-threshold",
+        type=fuzzy_threshold,
+        default=FUZZY_PLAN_URL_THRESHOLD,
+        help="trigram similarity a program key needs to borrow a missing plan URL",
+    )
+    parser.add_argument("--no-fuzzy", action="store_true", help="only fill plan URLs by exact program key")
+    parser.add_argument(
+        "--delta",
+        type=Path,
+        nargs="?",
+        const=OUTPUT_PATH,
+        metavar="BASE",
+        help="also write a patch from BASE (default: the previous payload) to availability_payload.patch.json",
+    )
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="also write per-plantel shards, the online shard and a manifest to availability_shards/",
+    )
+    parser.add_argument(
+        "--encoded",
+        action="store_true",
+        help="also write the dictionary-encoded payload with gzip/brotli variants and an ETag",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="record per-sheet metrics in debug and stage timings in availability_payload.profile.json",
+    )
+    args = parser.parse_args(argv)
+    if args.source == "sheets" and args.stream:
+        parser.error("--stream reads an xlsx file; it does not apply to --source sheets")
+    return args
+
+
+def build_profile(timer, debug, entry_count):
+    sheet_stages = {}
+    totals = {"sheets": len(debug), "rows": 0, "cells": 0, "hiddenRows": 0, "links": 0, "entries": entry_count}
+    for item in debug:
+        metrics = item["metrics"]
+        for key in ("rows", "cells", "hiddenRows", "links"):
+            totals[key] += metrics[key]
+        for stage, seconds in metrics["stages"].items():
+            sheet_stages[stage] = round(sheet_stages.get(stage, 0.0) + seconds, 6)
+    slowest = sorted(debug, key=lambda item: item["metrics"]["totalSeconds"], reverse=True)[:5]
+    return {
+        "stages": timer.stages,
+        "totalSeconds": timer.total(),
+        "sheetStages": sheet_stages,
+        "totals": totals,
+        "slowestSheets": [
+            {"plantel": item["plantel"], "totalSeconds": item["metrics"]["totalSeconds"]} for item in slowest
+        ],
+        "peakRssMb": peak_rss_mb(),
+        "workerPeakRssMb": peak_rss_mb(children=True),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    timer = StageTimer() if args.profile else NULL_TIMER
+    with timer.stage("plan_urls"):
+        plan_url_by_program = plan_urls_from_rows(read_plan_urls(PLAN_URL_PATH))
+    source = XLSX_PATH
+    if args.source == "sheets":
+        source = timer.run("fetch", SheetsWorkbook.fetch, args.sheet_id, args.sheets_endpoint)
+    availability, debug, report = collect_availability(
+        source,
+        args.workers,
+        None if args.no_cache else CACHE_PATH,
+        args.profile,
+        timer,
+        None if args.no_snapshot else SNAPSHOT_DIR,
+        args.stream,
+    )
+    payload = assemble_payload(
+        availability,
+        debug,
+        plan_url_by_program,
+        timer=timer,
+        fuzzy_threshold=None if args.no_fuzzy else args.fuzzy_threshold,
+    )
+    # Read the delta base before the new payload overwrites it.
+    previous = json.loads(args.delta.read_text(encoding="utf-8")) if args.delta and args.delta.exists() else None
+    written = timer.run("serialize", write_payload, payload, OUTPUT_PATH, args.pretty)
+    if written["written"]:
+        print(f"Wrote {len(availability)} entries to {OUTPUT_PATH}")
+    else:
+        print(f"{OUTPUT_PATH} unchanged ({len(availability)} entries); not rewritten")
+    if args.delta:
+        if previous is None:
+            print(f"No delta base at {args.delta}; skipped the patch")
+        else:
+            patch = timer.run("delta", diff_payloads, previous, payload)
+            write_json(patch, PATCH_PATH)
+            print(f"Wrote patch {patch_summary(patch)} against {args.delta} to {PATCH_PATH}")
+    if args.shards:
+        manifest = timer.run("shards", write_shards, payload, SHARDS_DIR, written)
+        print(f"Wrote {len(manifest['shards'])} plantel shards and the online shard to {SHARDS_DIR}")
+    if args.encoded:
+        encoded = timer.run("encode", write_encoded_payload, payload, ENCODED_PATH)
+        print(f"Wrote encoded payload to {ENCODED_PATH} {encoded['bytes']} etag={encoded['etag']}")
+    if args.profile:
+        profile = build_profile(timer, debug, len(payload["availability"]))
+        write_json(profile, PROFILE_PATH, pretty=True)
+        print(f"Profile: {profile['totalSeconds']}s, peak RSS {profile['peakRssMb']}MB -> {PROFILE_PATH}")
+    if report is not None:
+        print(format_report(report))
+        if args.report:
+            write_json(report, args.report, pretty=True)
 
 
 if __name__ == "__main__":
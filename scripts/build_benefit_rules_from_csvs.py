@@ -1,31 +1,33 @@
+import argparse
 import csv
-import json
 import re
+from bisect import bisect_right, insort
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+from benefit_index import INDEX_PATH, BenefitIndex, normalize_rule_value, rule_planteles
+from json_output import write_json
+from normalization import normalize_text
+
 LIC_PATH = Path(r"C:\Users\RicardoMartinezH\Downloads\Copia de  OPP _ Precios Enero 2026 - Licenciatura.csv")
 LIC_ONLINE_PATH = Path(r"C:\Users\RicardoMartinezH\Downloads\Copia de  OPP _ Precios Enero 2026 - Lic. Online .csv")
 BACH_PATH = Path(r"C:\Users\RicardoMartinezH\Downloads\Copia de  OPP _ Precios Enero 2026 - Bachillerato.csv")
 OUTPUT_PATH = Path(r"C:\Users\RicardoMartinezH\ReCalc\scripts\benefit_rules.json")
+# Percent and modalidad cells repeat across rows; each distinct text is parsed once.
+PARSE_CACHE_SIZE = 4096
+PERCENT_RE = re.compile(r"\d+(\.\d+)?")
+REPLACEMENT_CHAR = "\ufffd"
 
 
-def normalize_text(value: str) -> str:
-    return (
-        str(value or "")
-        .strip()
-        .lower()
-        .encode("ascii", "ignore")
-        .decode("ascii")
-    )
-
-
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
 def parse_percent(value: str | None) -> int | None:
     if value is None:
         return None
     text = str(value)
     if "%" not in text:
         return None
-    match = re.search(r"\d+(\.\d+)?", text)
+    match = PERCENT_RE.search(text)
     if not match:
         return None
     amount = int(float(match.group(0)))
@@ -34,6 +36,7 @@ def parse_percent(value: str | None) -> int | None:
     return amount
 
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
 def normalize_modalidad(value: str | None) -> str:
     normalized = normalize_text(value or "")
     if not normalized:
@@ -67,9 +70,59 @@ def should_apply(value: str | None) -> bool:
     return True
 
 
-def load_csv(path: Path):
-    with path.open("r", newline="", encoding="utf-8", errors="replace") as f:
-        return list(csv.reader(f))
+def cell(row, idx) -> str:
+    return row[idx] if len(row) > idx else ""
+
+
+def column_letter(idx: int) -> str:
+    letters = ""
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+class CsvReport:
+    """Streams one price CSV and records the cells it could not read.
+
+    Undecodable bytes become U+FFFD (``errors="replace"``); such cells, and
+    percent cells that do not parse, are listed with their location instead
+    of silently turning into missing rules.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.problems = []
+
+    def add(self, row_num, col_idx, issue, value):
+        self.problems.append(
+            {
+                "file": self.path.name,
+                "row": row_num,
+                "column": column_letter(col_idx),
+                "issue": issue,
+                "value": value,
+            }
+        )
+
+    def rows(self):
+        """(1-based row number, row) pairs, read one at a time."""
+        with self.path.open("r", newline="", encoding="utf-8", errors="replace") as f:
+            for row_num, row in enumerate(csv.reader(f), start=1):
+                for col_idx, value in enumerate(row):
+                    if REPLACEMENT_CHAR in value:
+                        self.add(row_num, col_idx, "replacement character", value)
+                yield row_num, row
+
+    def percent(self, row_num, row, col_idx, required=False):
+        # ``required`` marks cells of a rule that applies, where even an empty
+        # cell means a lost rule; elsewhere only non-empty text is reported.
+        value = cell(row, col_idx)
+        amount = parse_percent(value)
+        if amount is None and (required or value.strip()):
+            self.add(row_num, col_idx, "unparseable percent", value)
+        return amount
 
 
 def plantel_from_row(row):
@@ -100,86 +153,237 @@ def add_rule(rules, *, linea, plantel, modalidad, porcentaje, comentario, plan="
     )
 
 
-def build_rules():
-    rules = []
+def rule_key(rule):
+    return (
+        rule["lineaNegocio"],
+        rule["modalidad"],
+        rule["plan"],
+        rule["activo"],
+        rule["porcentaje"],
+        rule["comentario"],
+    )
+
+
+def rule_payload(rule):
+    return (rule["activo"], rule["porcentaje"], rule["comentario"])
+
+
+def values_overlap(left: str, right: str) -> bool:
+    return left == "*" or right == "*" or left == right
+
+
+def compact_rules(rules):
+    """Merge rules that differ only by plantel into multi-plantel rules.
+
+    resolveDefaultBenefit keeps the first rule with the best score, so order
+    matters: a plantel is dropped when an earlier identical rule already
+    covers it (that rule always wins the tie), and a rule is folded into an
+    earlier group only when no rule emitted since could tie with it for one
+    of its planteles and answer differently. Otherwise it starts a new group
+    in place, so every lookup resolves to the same porcentaje/comentario.
+    """
+    groups = []
+    groups_by_key = {}
+    covered_by_key = {}
+    groups_by_plantel = {}
+    wildcard_groups = []
+
+    def conflicts_after(group_idx, rule, planteles):
+        linea = normalize_rule_value(rule["lineaNegocio"])
+        modalidad = normalize_rule_value(rule["modalidad"])
+        plan = normalize_rule_value(rule["plan"])
+        payload = rule_payload(rule)
+        for plantel in planteles:
+            candidates = groups_by_plantel.get(plantel, [])
+            for idx in candidates[bisect_right(candidates, group_idx) :] + wildcard_groups[
+                bisect_right(wildcard_groups, group_idx) :
+            ]:
+                other = groups[idx]
+                if (
+                    values_overlap(linea, normalize_rule_value(other["lineaNegocio"]))
+                    and values_overlap(modalidad, normalize_rule_value(other["modalidad"]))
+                    and values_overlap(plan, normalize_rule_value(other["plan"]))
+                    and rule_payload(other) != payload
+                ):
+                    return True
+        return False
+
+    def index_planteles(group_idx, planteles):
+        for plantel in planteles:
+            if plantel == "*":
+                insort(wildcard_groups, group_idx)
+            else:
+                insort(groups_by_plantel.setdefault(plantel, []), group_idx)
 
-    for row in load_csv(LIC_PATH):
+    for rule in rules:
+        key = rule_key(rule)
+        covered = covered_by_key.setdefault(key, set())
+        pending = []
+        seen = set()
+        for plantel in rule_planteles(rule):
+            normalized = normalize_rule_value(plantel)
+            if normalized in covered or normalized in seen:
+                continue
+            seen.add(normalized)
+            pending.append((plantel, normalized))
+        if not pending:
+            continue
+
+        normalized_planteles = [normalized for _, normalized in pending]
+        candidates = groups_by_key.get(key)
+        target = candidates[-1] if candidates else None
+        if (
+            target is not None
+            and "*" not in normalized_planteles
+            and not conflicts_after(target, rule, normalized_planteles)
+        ):
+            groups[target]["plantel"].extend(plantel for plantel, _ in pending)
+        else:
+            target = len(groups)
+            groups.append({**rule, "plantel": [plantel for plantel, _ in pending]})
+            groups_by_key.setdefault(key, []).append(target)
+        covered.update(normalized_planteles)
+        index_planteles(target, normalized_planteles)
+
+    return groups
+
+
+def lic_rules(rows, report):
+    rules = []
+    for row_num, row in rows:
         plantel = plantel_from_row(row)
         if not plantel:
             continue
-        lic_apply = row[12] if len(row) > 12 else ""
-        lic_modalidad = row[13] if len(row) > 13 else ""
-        lic_percent = row[14] if len(row) > 14 else ""
+        lic_apply = cell(row, 12)
         if should_apply(lic_apply):
             add_rule(
                 rules,
                 linea="licenciatura",
                 plantel=plantel,
-                modalidad=normalize_modalidad(lic_modalidad),
-                porcentaje=parse_percent(lic_percent),
+                modalidad=normalize_modalidad(cell(row, 13)),
+                porcentaje=report.percent(row_num, row, 14, required=True),
                 comentario=normalize_comment(lic_apply),
             )
 
-        salud_percent = row[9] if len(row) > 9 else ""
-        if parse_percent(salud_percent) is not None:
+        salud_percent = report.percent(row_num, row, 9)
+        if salud_percent is not None:
             add_rule(
                 rules,
                 linea="salud",
                 plantel=plantel,
                 modalidad="*",
-                porcentaje=parse_percent(salud_percent),
+                porcentaje=salud_percent,
                 comentario="",
             )
+    return rules
 
-    for row in load_csv(LIC_ONLINE_PATH):
+
+def lic_online_rules(rows, report):
+    rules = []
+    for row_num, row in rows:
         plantel = plantel_from_row(row)
         if not plantel:
             continue
-        online_apply = row[12] if len(row) > 12 else ""
-        online_modalidad = row[13] if len(row) > 13 else ""
-        online_percent = row[14] if len(row) > 14 else ""
-        if should_apply(online_apply) and parse_percent(online_percent) is not None:
+        online_apply = cell(row, 12)
+        if should_apply(online_apply):
             add_rule(
                 rules,
                 linea="licenciatura",
                 plantel=plantel,
-                modalidad=normalize_modalidad(online_modalidad),
-                porcentaje=parse_percent(online_percent),
+                modalidad=normalize_modalidad(cell(row, 13)),
+                porcentaje=report.percent(row_num, row, 14, required=True),
                 comentario=normalize_comment(online_apply),
             )
+    return rules
+
 
-    for row in load_csv(BACH_PATH):
+def bach_rules(rows, report):
+    rules = []
+    for row_num, row in rows:
         plantel = plantel_from_row(row)
         if not plantel:
             continue
-        bach_apply = row[14] if len(row) > 14 else ""
-        bach_comment = row[15] if len(row) > 15 else ""
-        bach_modalidad = row[16] if len(row) > 16 else ""
-        bach_percent = row[17] if len(row) > 17 else ""
+        bach_apply = cell(row, 14)
+        bach_comment = cell(row, 15)
         plan = "*"
-        if len(row) > 10 and str(row[10]).strip():
+        if str(cell(row, 10)).strip():
             plan = "9"
-        if len(row) > 4 and str(row[4]).strip():
+        if str(cell(row, 4)).strip():
             plan = "6"
-        if should_apply(bach_apply) and parse_percent(bach_percent) is not None:
+        if should_apply(bach_apply):
             add_rule(
                 rules,
                 linea="preparatoria",
                 plantel=plantel,
-                modalidad=normalize_modalidad(bach_modalidad),
-                porcentaje=parse_percent(bach_percent),
+                modalidad=normalize_modalidad(cell(row, 16)),
+                porcentaje=report.percent(row_num, row, 17, required=True),
                 comentario=normalize_comment(bach_comment) or normalize_comment(bach_apply),
                 plan=plan,
             )
+    return rules
+
 
+def read_rules(rules_for_file, path: Path):
+    """(rules, problems) for one CSV, streamed row by row."""
+    report = CsvReport(path)
+    rules = rules_for_file(report.rows(), report)
+    return rules, report.problems
+
+
+def build_rules(lic_path=LIC_PATH, lic_online_path=LIC_ONLINE_PATH, bach_path=BACH_PATH, workers=1, problems=None):
+    """Rules from the three price CSVs, in file order.
+
+    With ``workers`` > 1 the files are parsed in parallel processes. Problem
+    cells are appended to ``problems`` when it is given.
+    """
+    tasks = [(lic_rules, lic_path), (lic_online_rules, lic_online_path), (bach_rules, bach_path)]
+    if workers <= 1:
+        results = [read_rules(task, path) for task, path in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(read_rules, *zip(*tasks)))
+    rules = []
+    for file_rules, file_problems in results:
+        rules.extend(file_rules)
+        if problems is not None:
+            problems.extend(file_problems)
     return rules
 
 
-if __name__ == "__main__":
-    benefit_rules = build_rules()
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    OUTPUT_PATH.write_text(
-        json.dumps({"rules": benefit_rules}, ensure_ascii=False, indent=2),
-        encoding="utf-8",
+def write_rules(rules, path: Path, pretty=False):
+    return write_json({"rules": rules}, path, pretty)
+
+
+def format_problem(problem) -> str:
+    return f"{problem['file']} {problem['column']}{problem['row']}: {problem['issue']} {problem['value']!r}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build benefit_rules.json from the price CSVs.")
+    parser.add_argument("--workers", type=int, default=1, help="parse the three CSVs on N worker processes")
+    parser.add_argument("--pretty", action="store_true", help="indent benefit_rules.json for reading")
+    parser.add_argument("--report", type=Path, help="write the cells that could not be read as JSON")
+    parser.add_argument(
+        "--index-output", type=Path, default=INDEX_PATH, help="where to write the precompiled index resolve_benefit loads"
     )
-    print(f"Wrote {len(benefit_rules)} benefit rules to {OUTPUT_PATH}")
+    args = parser.parse_args(argv)
+
+    problems = []
+    raw_rules = build_rules(workers=args.workers, problems=problems)
+    benefit_rules = compact_rules(raw_rules)
+    if write_rules(benefit_rules, OUTPUT_PATH, args.pretty)["written"]:
+        print(f"Wrote {len(benefit_rules)} benefit rules to {OUTPUT_PATH} (compacted from {len(raw_rules)})")
+    else:
+        print(f"{OUTPUT_PATH} unchanged ({len(benefit_rules)} benefit rules); not rewritten")
+    if write_json(BenefitIndex.from_rules(benefit_rules).to_json(), args.index_output)["written"]:
+        print(f"Wrote benefit index to {args.index_output}")
+    else:
+        print(f"{args.index_output} unchanged; not rewritten")
+    for problem in problems:
+        print(f"WARNING {format_problem(problem)}")
+    if args.report:
+        write_json(problems, args.report, pretty=True)
+
+
+if __name__ == "__main__":
+    main()
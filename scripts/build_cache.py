@@ -0,0 +1,73 @@
+import hashlib
+import json
+from pathlib import Path
+
+from json_output import write_json
+
+CACHE_VERSION = 1
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def builder_fingerprint(sources) -> str:
+    # Any edit to the parsing code invalidates every cached sheet.
+    digest = hashlib.sha256(str(CACHE_VERSION).encode("ascii"))
+    for name in sources:
+        digest.update(name.encode("utf-8"))
+        digest.update((SCRIPTS_DIR / name).read_bytes())
+    return digest.hexdigest()
+
+
+def sheet_fingerprint(sheet) -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps(sheet.name, ensure_ascii=False).encode("utf-8"))
+    for row in sheet.rows:
+        digest.update(json.dumps(row, ensure_ascii=False, default=repr).encode("utf-8"))
+        digest.update(b"\n")
+    links = sorted(sheet.links_by_cell.items())
+    digest.update(json.dumps([[r, c, link] for (r, c), link in links], ensure_ascii=False).encode("utf-8"))
+    digest.update(json.dumps(sorted(sheet.hidden_rows)).encode("ascii"))
+    return digest.hexdigest()
+
+
+def load_cache(path: Path, fingerprint: str):
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("builder") != fingerprint:
+        return {}
+    return data.get("sheets", {})
+
+
+def save_cache(path: Path, fingerprint: str, sheets):
+    write_json({"builder": fingerprint, "sheets": sheets}, path)
+
+
+def diff_entries(previous, current):
+    previous_by_id = {entry["id"]: entry for entry in previous}
+    current_by_id = {entry["id"]: entry for entry in current}
+    return {
+        "added": [entry_id for entry_id in current_by_id if entry_id not in previous_by_id],
+        "removed": [entry_id for entry_id in previous_by_id if entry_id not in current_by_id],
+        "changed": [
+            entry_id
+            for entry_id, entry in current_by_id.items()
+            if entry_id in previous_by_id and previous_by_id[entry_id] != entry
+        ],
+    }
+
+
+def format_report(report) -> str:
+    lines = []
+    for item in report:
+        if item["status"] == "unchanged":
+            continue
+        lines.append(
+            f"  {item['plantel']}: {item['status']} "
+            f"+{len(item['added'])} -{len(item['removed'])} ~{len(item['changed'])}"
+        )
+    reused = sum(1 for item in report if item["status"] == "unchanged")
+    lines.append(f"  {reused}/{len(report)} sheets reused from cache")
+    return "\n".join(lines)
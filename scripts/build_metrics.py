@@ -0,0 +1,72 @@
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb(children=False):
+    # children: the largest of the waited-for child processes (pool workers).
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = round(self.stages.get(name, 0.0) + elapsed, 6)
+
+    def run(self, name, func, *args, **kwargs):
+        with self.stage(name):
+            return func(*args, **kwargs)
+
+    def total(self, exclude=()):
+        return round(sum(value for key, value in self.stages.items() if key not in exclude), 6)
+
+
+class NullTimer:
+    stages = {}
+
+    def stage(self, name):
+        return nullcontext()
+
+    def run(self, name, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+NULL_TIMER = NullTimer()
+
+
+class MemoryTracker:
+    """How far a piece of work raised the process's peak RSS.
+
+    Read from getrusage like bench_builders, so profiling adds no cost to
+    the stages it times (tracemalloc slowed allocation-heavy stages several
+    times over). 0 means the work fit under the earlier peak.
+    """
+
+    def __init__(self):
+        self.baseline = None
+
+    def start(self):
+        self.baseline = peak_rss_mb()
+
+    def growth_mb(self):
+        peak = peak_rss_mb()
+        if peak is None or self.baseline is None:
+            return None
+        return round(peak - self.baseline, 1)
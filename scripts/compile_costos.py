@@ -0,0 +1,300 @@
+import argparse
+import json
+from pathlib import Path
+
+from json_output import write_json
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "src" / "data"
+COSTOS_PATH = DATA_DIR / "costos_2026.json"
+FLAT_RULES_PATH = DATA_DIR / "costos_2026_flat_rules.json"
+META_PATH = DATA_DIR / "costos_2026_meta.json"
+OUTPUT_PATH = DATA_DIR / "costos_2026_compact.json"
+COMPACT_VERSION = 1
+RULE_SECTIONS = (("reglas_base", "base"), ("reglas_excepciones_por_plantel", "plantel_excepcion"))
+# Key order of each rule kind in the source files.
+BASE_KEYS = ("nivel", "modalidad", "plan", "tier", "rango", "porcentaje", "monto", "programa")
+EXCEPCION_KEYS = ("programa", "plantel", "nivel", "modalidad", "plan", "rango", "porcentaje", "monto", "tier")
+RULE_COLUMNS = ("row", "programa", "tier", "plantel", "band", "porcentaje", "monto", "origen")
+BAND_TOLERANCE = 1e-6
+# Candidate lists the calculator can pick: every rule, one plantel, or one tier.
+SELECT_ALL, SELECT_PLANTEL, SELECT_TIER = range(3)
+NONE = -1
+
+
+class StringTable:
+    def __init__(self, strings=()):
+        self.strings = list(strings)
+        self.ids = {value: idx for idx, value in enumerate(self.strings)}
+
+    def add(self, value):
+        if value is None:
+            return NONE
+        idx = self.ids.get(value)
+        if idx is None:
+            idx = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+    def get(self, idx):
+        return None if idx == NONE else self.strings[idx]
+
+
+def canonical(value) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+def source_rules(meta):
+    # costos_2026_flat_rules.json is reglas_base followed by the plantel
+    # exceptions, each tagged with its origen.
+    for section, origen in RULE_SECTIONS:
+        for rule in meta.get(section, []):
+            yield rule, origen
+
+
+def band_for(bands, rule):
+    return bands.index((rule["rango"]["min"], rule["rango"]["max"]))
+
+
+def first_rule_per_band(band_count, candidates, band_column):
+    # With disjoint bands, candidatos.find() over a promedio returns the
+    # first candidate whose band holds it.
+    firsts = [NONE] * band_count
+    for local in candidates:
+        band = band_column[local]
+        if firsts[band] == NONE:
+            firsts[band] = local
+    return firsts
+
+
+def compile_band_index(columns, band_count):
+    entries = []
+    by_programa = {}
+    for local, programa in enumerate(columns["programa"]):
+        by_programa.setdefault(programa, []).append(local)
+    for programa, locals_ in by_programa.items():
+        entries.append([programa, SELECT_ALL, NONE, first_rule_per_band(band_count, locals_, columns["band"])])
+        selectors = {}
+        for local in locals_:
+            plantel = columns["plantel"][local]
+            tier = columns["tier"][local]
+            if plantel != NONE:
+                selectors.setdefault((SELECT_PLANTEL, plantel), []).append(local)
+            elif tier != NONE:
+                selectors.setdefault((SELECT_TIER, tier), []).append(local)
+        for (kind, ref), candidates in selectors.items():
+            entries.append([programa, kind, ref, first_rule_per_band(band_count, candidates, columns["band"])])
+    return entries
+
+
+def compile_costos(meta):
+    strings = StringTable()
+    rules = list(source_rules(meta))
+    bands = sorted({(rule["rango"]["min"], rule["rango"]["max"]) for rule, _ in rules})
+    for (_, high), (low, _) in zip(bands, bands[1:]):
+        if low - BAND_TOLERANCE <= high + BAND_TOLERANCE:
+            raise ValueError(f"Promedio bands overlap at {low}; the band index needs disjoint bands")
+
+    groups = {}
+    for row, (rule, origen) in enumerate(rules):
+        key = (strings.add(rule["nivel"]), strings.add(rule["modalidad"]), rule["plan"])
+        columns = groups.setdefault(key, {name: [] for name in RULE_COLUMNS})
+        columns["row"].append(row)
+        columns["programa"].append(strings.add(rule["programa"]))
+        columns["tier"].append(strings.add(rule["tier"]) if "tier" in rule else NONE)
+        columns["plantel"].append(strings.add(rule.get("plantel")))
+        columns["band"].append(band_for(bands, rule))
+        columns["porcentaje"].append(rule["porcentaje"])
+        columns["monto"].append(rule["monto"])
+        columns["origen"].append(strings.add(origen))
+
+    planteles = meta.get("planteles", {})
+    fields = [name for name in next(iter(planteles.values()), {}) if name not in ("tier", "cargos")]
+    plantel_table = {"name": [], "tier": [], "cargos": [], **{name: [] for name in fields}}
+    cargos = []
+    cargos_ids = {}
+    for name, plantel in planteles.items():
+        if set(plantel) != {*fields, "tier", "cargos"}:
+            raise ValueError(f"Plantel {name!r} does not have the shared plantel fields")
+        plantel_table["name"].append(strings.add(name))
+        plantel_table["tier"].append(strings.add(plantel["tier"]))
+        cargos_key = canonical(plantel["cargos"])
+        if cargos_key not in cargos_ids:
+            cargos_ids[cargos_key] = len(cargos)
+            cargos.append(plantel["cargos"])
+        plantel_table["cargos"].append(cargos_ids[cargos_key])
+        for field in fields:
+            plantel_table[field].append(plantel[field])
+
+    info = {key: value for key, value in meta.items() if key not in ("planteles", *(s for s, _ in RULE_SECTIONS))}
+    return {
+        "version": COMPACT_VERSION,
+        "strings": strings.strings,
+        "bands": [list(band) for band in bands],
+        "groups": [
+            {
+                "nivel": nivel,
+                "modalidad": modalidad,
+                "plan": plan,
+                "rules": columns,
+                "bandIndex": compile_band_index(columns, len(bands)),
+            }
+            for (nivel, modalidad, plan), columns in groups.items()
+        ],
+        "planteles": plantel_table,
+        "cargos": cargos,
+        "info": info,
+    }
+
+
+def expand_rules(compact):
+    """Rows of (rule, origen) in source order, rebuilt from the grouped columns."""
+    strings = StringTable(compact["strings"])
+    rows = {}
+    for group in compact["groups"]:
+        columns = group["rules"]
+        for local, row in enumerate(columns["row"]):
+            values = {
+                "programa": strings.get(columns["programa"][local]),
+                "plantel": strings.get(columns["plantel"][local]),
+                "nivel": strings.get(group["nivel"]),
+                "modalidad": strings.get(group["modalidad"]),
+                "plan": group["plan"],
+                "tier": strings.get(columns["tier"][local]),
+                "rango": dict(zip(("min", "max"), compact["bands"][columns["band"][local]])),
+                "porcentaje": columns["porcentaje"][local],
+                "monto": columns["monto"][local],
+            }
+            origen = strings.get(columns["origen"][local])
+            keys = BASE_KEYS if origen == RULE_SECTIONS[0][1] else EXCEPCION_KEYS
+            rule = {
+                key: values[key]
+                for key in keys
+                if not (key == "tier" and columns["tier"][local] == NONE)
+            }
+            rows[row] = (rule, origen)
+    return [rows[row] for row in range(len(rows))]
+
+
+def expand_costos(compact):
+    """Rebuild (costos_2026, costos_2026_flat_rules, costos_2026_meta)."""
+    if compact.get("version") != COMPACT_VERSION:
+        raise ValueError(f"Unsupported compact costos version: {compact.get('version')!r}")
+    strings = StringTable(compact["strings"])
+    rules = expand_rules(compact)
+    flat_rules = [{**rule, "origen": origen} for rule, origen in rules]
+    sections = {section: [rule for rule, origen in rules if origen == tag] for section, tag in RULE_SECTIONS}
+    # costos_2026.json holds the nuevo_ingreso base rules without programa.
+    costos = [
+        {key: value for key, value in rule.items() if key != "programa"}
+        for rule in sections["reglas_base"]
+        if rule["programa"] == "nuevo_ingreso"
+    ]
+
+    table = compact["planteles"]
+    fields = [name for name in table if name not in ("name", "tier", "cargos")]
+    planteles = {}
+    for idx, name_id in enumerate(table["name"]):
+        plantel = {field: table[field][idx] for field in fields}
+        plantel["tier"] = strings.get(table["tier"][idx])
+        plantel["cargos"] = compact["cargos"][table["cargos"][idx]]
+        planteles[strings.get(name_id)] = plantel
+    meta = {**compact["info"], **sections, "planteles": planteles}
+    return costos, flat_rules, meta
+
+
+def candidate_match(rules, programa, nivel, modalidad, plan, kind, ref, promedio):
+    # The calculator's filter + find over the flat rule list.
+    candidates = [
+        rule
+        for rule in rules
+        if rule["programa"] == programa and rule["nivel"] == nivel and rule["modalidad"] == modalidad and rule["plan"] == plan
+    ]
+    if kind == SELECT_PLANTEL:
+        candidates = [rule for rule in candidates if rule.get("plantel") == ref]
+    elif kind == SELECT_TIER:
+        candidates = [rule for rule in candidates if rule.get("tier") == ref and not rule.get("plantel")]
+    return next(
+        (
+            rule
+            for rule in candidates
+            if rule["rango"]["min"] - BAND_TOLERANCE <= promedio <= rule["rango"]["max"] + BAND_TOLERANCE
+        ),
+        None,
+    )
+
+
+def validate(compact, costos, flat_rules, meta):
+    """Problems found comparing the compact artifact with the source files."""
+    problems = []
+    expanded = expand_costos(compact)
+    for name, expected, actual in zip(
+        (COSTOS_PATH.name, FLAT_RULES_PATH.name, META_PATH.name), (costos, flat_rules, meta), expanded
+    ):
+        if canonical(expected) != canonical(actual):
+            problems.append(f"{name} does not round-trip through the compact artifact")
+
+    # Every band index entry must agree with a linear scan at every promedio
+    # the calculator can produce (one decimal, 0.1 to 10.0).
+    strings = StringTable(compact["strings"])
+    promedios = [step / 10 for step in range(1, 101)]
+    for group in compact["groups"]:
+        nivel, modalidad, plan = strings.get(group["nivel"]), strings.get(group["modalidad"]), group["plan"]
+        columns = group["rules"]
+        for programa_id, kind, ref_id, firsts in group["bandIndex"]:
+            programa, ref = strings.get(programa_id), strings.get(ref_id)
+            for promedio in promedios:
+                band = next(
+                    (
+                        idx
+                        for idx, (low, high) in enumerate(compact["bands"])
+                        if low - BAND_TOLERANCE <= promedio <= high + BAND_TOLERANCE
+                    ),
+                    None,
+                )
+                local = NONE if band is None else firsts[band]
+                indexed = None if local == NONE else flat_rules[columns["row"][local]]
+                expected = candidate_match(flat_rules, programa, nivel, modalidad, plan, kind, ref, promedio)
+                if indexed is not expected:
+                    problems.append(
+                        f"band index for {programa}/{nivel}/{modalidad}/{plan} selector {kind}:{ref} "
+                        f"disagrees at promedio {promedio}"
+                    )
+                    break
+    return problems
+
+
+def load_json(path: Path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the costos 2026 data files into one compact indexed artifact.")
+    parser.add_argument("--meta", type=Path, default=META_PATH)
+    parser.add_argument("--costos", type=Path, default=COSTOS_PATH)
+    parser.add_argument("--flat-rules", type=Path, default=FLAT_RULES_PATH)
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    parser.add_argument("--check", action="store_true", help="validate the existing artifact instead of writing it")
+    args = parser.parse_args(argv)
+
+    meta = load_json(args.meta)
+    compact = load_json(args.output) if args.check else compile_costos(meta)
+    problems = validate(compact, load_json(args.costos), load_json(args.flat_rules), meta)
+    for problem in problems:
+        print(f"ERROR {problem}")
+    if problems:
+        raise SystemExit(1)
+    if args.check:
+        print(f"{args.output} matches {args.costos.name}, {args.flat_rules.name} and {args.meta.name}")
+        return
+
+    written = write_json(compact, args.output)
+    source_bytes = sum(path.stat().st_size for path in (args.costos, args.flat_rules, args.meta))
+    print(
+        f"{'Wrote' if written['written'] else 'Unchanged, not rewritten:'} {args.output} ({written['bytes']} bytes, "
+        f"sources {source_bytes} bytes, {sum(len(g['rules']['row']) for g in compact['groups'])} rules)"
+    )
+
+
+if __name__ == "__main__":
+    main()
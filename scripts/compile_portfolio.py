@@ -0,0 +1,60 @@
+import argparse
+
+from build_availability_from_xlsx import (
+    OUTPUT_PATH,
+    PLAN_URL_PATH,
+    XLSX_PATH,
+    assemble_payload,
+    build_entries,
+    is_skipped_sheet,
+    map_sheets,
+    open_worker_workbook,
+    write_payload,
+)
+from extract_plan_urls import collect_program_links, plan_url_rows, plan_urls_from_rows, write_plan_urls
+from workbook_snapshot import open_workbook
+
+
+def load_sheet_tables(xlsx_path, sheet_name):
+    # Every sheet (including "Oferta General") feeds the plan-URL link table;
+    # availability entries skip the general-offer sheet as before.
+    sheet = open_worker_workbook(xlsx_path).read_sheet(sheet_name)
+    entries = None if is_skipped_sheet(sheet_name) else build_entries(sheet)
+    return entries, collect_program_links(sheet, {})
+
+
+def compile_portfolio(xlsx_path, workers=1):
+    with open_workbook(xlsx_path) as wb:
+        sheet_names = list(wb.sheetnames)
+
+    program_links = {}
+    availability = []
+    debug = []
+    for sheet_name, (entries, sheet_links) in zip(
+        sheet_names, map_sheets(load_sheet_tables, xlsx_path, sheet_names, workers=workers)
+    ):
+        for key, link in sheet_links.items():
+            program_links.setdefault(key, link)
+        if entries is None:
+            continue
+        availability.extend(entries)
+        debug.append({"plantel": sheet_name, "entries": len(entries)})
+
+    plan_rows = plan_url_rows(program_links)
+    payload = assemble_payload(availability, debug, plan_urls_from_rows(plan_rows))
+    return payload, plan_rows, len(availability)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile availability payload and plan-URL CSV in one pass.")
+    parser.add_argument("--workers", type=int, default=1, help="process sheets on N worker processes")
+    args = parser.parse_args(argv)
+    payload, plan_rows, entry_count = compile_portfolio(XLSX_PATH, args.workers)
+    write_plan_urls(plan_rows, PLAN_URL_PATH)
+    write_payload(payload, OUTPUT_PATH)
+    print(f"wrote {len(plan_rows)} rows to {PLAN_URL_PATH}")
+    print(f"Wrote {entry_count} entries to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import argparse
+import csv
+import json
+from pathlib import Path
+
+from csv_reader import read_columns
+from json_output import write_json
+from normalization import normalize_text
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "src" / "data"
+REGRESO_PATH = DATA_DIR / "regreso_materias.json"
+OUTPUT_PATH = DATA_DIR / "regreso_materias_compact.json"
+COMPACT_VERSION = 1
+# The calculator prices every online request from the ONLINE plantel.
+ONLINE_PLANTEL = "ONLINE"
+REQUEST_FIELDS = ("plantel", "modalidad", "materias")
+NONE = -1
+
+
+def table_price(unit, materias) -> float:
+    return round(unit * materias, 2)
+
+
+def compile_table(prices):
+    """[unit, counts] or [unit, counts, exceptions] for one {"1": ..., "2": ...} table.
+
+    The unit is the per-subject price that reproduces the most counts; the
+    counts it does not reproduce are kept verbatim as exceptions.
+    """
+    counts = len(prices)
+    if list(prices) != [str(materias) for materias in range(1, counts + 1)]:
+        raise ValueError(f"Subject counts {list(prices)} are not 1..{counts} in order")
+    values = [prices[str(materias)] for materias in range(1, counts + 1)]
+    best = None
+    for materias, value in enumerate(values, start=1):
+        unit = round(value / materias, 2)
+        matches = sum(table_price(unit, count) == price for count, price in enumerate(values, start=1))
+        if best is None or matches > best[0]:
+            best = (matches, unit)
+    unit = best[1]
+    exceptions = {
+        str(materias): value for materias, value in enumerate(values, start=1) if table_price(unit, materias) != value
+    }
+    return [unit, counts, exceptions] if exceptions else [unit, counts]
+
+
+def expand_table(table):
+    unit, counts, exceptions = (*table, {}) if len(table) == 2 else table
+    return {str(materias): exceptions.get(str(materias), table_price(unit, materias)) for materias in range(1, counts + 1)}
+
+
+def compile_regreso(source):
+    modalidades = list(next(iter(source["materias"].values()), {}))
+    tables = []
+    table_ids = {}
+    planteles = {}
+    for plantel, by_modalidad in source["materias"].items():
+        if list(by_modalidad) != modalidades:
+            raise ValueError(f"Plantel {plantel!r} does not list the modalidades {modalidades}")
+        refs = []
+        for modalidad in modalidades:
+            prices = by_modalidad[modalidad]
+            if not prices:
+                refs.append(NONE)
+                continue
+            table = compile_table(prices)
+            key = json.dumps(table, sort_keys=True)
+            if key not in table_ids:
+                table_ids[key] = len(tables)
+                tables.append(table)
+            refs.append(table_ids[key])
+        planteles[plantel] = refs
+    info = {key: value for key, value in source.items() if key != "materias"}
+    return {"version": COMPACT_VERSION, "info": info, "modalidades": modalidades, "tables": tables, "planteles": planteles}
+
+
+def expand_regreso(compact):
+    """Rebuild regreso_materias.json from the compact tables."""
+    if compact.get("version") != COMPACT_VERSION:
+        raise ValueError(f"Unsupported compact regreso version: {compact.get('version')!r}")
+    materias = {}
+    for plantel, refs in compact["planteles"].items():
+        materias[plantel] = {
+            modalidad: {} if ref == NONE else expand_table(compact["tables"][ref])
+            for modalidad, ref in zip(compact["modalidades"], refs)
+        }
+    return {**compact["info"], "materias": materias}
+
+
+def validate(compact, source):
+    """Problems found comparing the compact artifact with the source file."""
+    problems = []
+    expanded = expand_regreso(compact)
+    # Key order matters too: the rebuilt file must serialize exactly like the source.
+    if json.dumps(expanded, ensure_ascii=False) != json.dumps(source, ensure_ascii=False):
+        problems.append(f"{REGRESO_PATH.name} does not round-trip through the compact artifact")
+    # Every request the calculator can make must price like its nested lookup.
+    pricer = RegresoPricer(compact)
+    counts = max((len(prices) for by_modalidad in source["materias"].values() for prices in by_modalidad.values()), default=0)
+    for plantel in source["materias"]:
+        for modalidad in ("presencial", "online"):
+            for materias in range(1, counts + 2):
+                expected = source_price(source, plantel, modalidad, materias)
+                actual = pricer.price(plantel, modalidad, materias)
+                if actual != expected:
+                    problems.append(f"{plantel}/{modalidad}/{materias} prices {actual} instead of {expected}")
+    return problems
+
+
+def source_price(source, plantel, modalidad, materias):
+    # REGRESO_MATERIAS.materias?.[plantelKey]?.[modalidadKey]?.[String(materias)]
+    plantel_key = ONLINE_PLANTEL if modalidad == "online" else plantel
+    modalidad_key = "online" if modalidad == "online" else "presencial"
+    return source["materias"].get(plantel_key, {}).get(modalidad_key, {}).get(str(materias))
+
+
+def parse_materias(value):
+    try:
+        number = float(str(value).strip())
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else None
+
+
+class RegresoPricer:
+    """Subject-count prices for returning licenciatura students.
+
+    Resolves a request the way ScholarshipCalculator.tsx does: online
+    requests read the ONLINE plantel, everything else its plantel's
+    presencial table. Planteles match without accents or case.
+    """
+
+    def __init__(self, compact):
+        self.modalidades = compact["modalidades"]
+        self.planteles = {normalize_text(plantel): plantel for plantel in compact["planteles"]}
+        self._tables = {}
+        for plantel, refs in compact["planteles"].items():
+            for modalidad, ref in zip(self.modalidades, refs):
+                if ref == NONE:
+                    continue
+                prices = expand_table(compact["tables"][ref])
+                self._tables[plantel, modalidad] = {int(materias): price for materias, price in prices.items()}
+
+    @classmethod
+    def load(cls, path: Path = OUTPUT_PATH):
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    def table(self, plantel, modalidad):
+        online = normalize_text(modalidad) == "online"
+        plantel_key = ONLINE_PLANTEL if online else self.planteles.get(normalize_text(plantel), plantel)
+        return self._tables.get((plantel_key, "online" if online else "presencial"), {})
+
+    def price(self, plantel, modalidad, materias):
+        """The list price, or None when the plantel has no price for that count."""
+        return self.table(plantel, modalidad).get(parse_materias(materias))
+
+    def price_many(self, requests):
+        """Prices for (plantel, modalidad, materias) requests, in request order."""
+        tables = {}
+        prices = []
+        for plantel, modalidad, materias in requests:
+            table = tables.get((plantel, modalidad))
+            if table is None:
+                table = tables[plantel, modalidad] = self.table(plantel, modalidad)
+            prices.append(table.get(parse_materias(materias)))
+        return prices
+
+
+def price_requests(path: Path, output: Path, pricer):
+    fieldnames, columns = read_columns(path)
+    missing = [name for name in REQUEST_FIELDS if name not in columns]
+    if missing:
+        raise SystemExit(f"{path} is missing columns: {', '.join(missing)}")
+    prices = pricer.price_many(zip(*(columns[name] for name in REQUEST_FIELDS)))
+    with Path(output).open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([*fieldnames, "precio"])
+        writer.writerows(
+            zip(*(columns[name] for name in fieldnames), ("" if price is None else f"{price:.2f}" for price in prices))
+        )
+    return prices
+
+
+def load_json(path: Path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compile regreso_materias.json into per-subject unit prices plus exceptions, or price requests."
+    )
+    parser.add_argument("--source", type=Path, default=REGRESO_PATH)
+    parser.add_argument("--output", type=Path, default=OUTPUT_PATH)
+    parser.add_argument("--check", action="store_true", help="validate the existing artifact instead of writing it")
+    parser.add_argument(
+        "--price",
+        type=Path,
+        metavar="CSV",
+        help="price a CSV with plantel, modalidad, materias columns to <CSV>.prices.csv using the artifact",
+    )
+    args = parser.parse_args(argv)
+
+    if args.price:
+        output = args.price.with_suffix(".prices.csv")
+        prices = price_requests(args.price, output, RegresoPricer.load(args.output))
+        unpriced = sum(price is None for price in prices)
+        print(f"Priced {len(prices)} requests to {output} ({unpriced} without a price)")
+        return
+
+    source = load_json(args.source)
+    compact = load_json(args.output) if args.check else compile_regreso(source)
+    problems = validate(compact, source)
+    for problem in problems:
+        print(f"ERROR {problem}")
+    if problems:
+        raise SystemExit(1)
+    if args.check:
+        print(f"{args.output} matches {args.source.name}")
+        return
+
+    written = write_json(compact, args.output)
+    exceptions = sum(len(table) == 3 for table in compact["tables"])
+    print(
+        f"{'Wrote' if written['written'] else 'Unchanged, not rewritten:'} {args.output} ({written['bytes']} bytes, source {args.source.stat().st_size} bytes, "
+        f"{len(compact['tables'])} distinct tables, {exceptions} with exceptions)"
+    )
+
+
+if __name__ == "__main__":
+    main()
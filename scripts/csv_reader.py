@@ -0,0 +1,17 @@
+import csv
+from pathlib import Path
+
+
+def read_columns(path: Path):
+    """(fieldnames, {name: [values]}) for a request CSV, in row order.
+
+    Missing cells read as "", and a UTF-8 BOM (Excel exports) is dropped.
+    """
+    with Path(path).open(newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames or [])
+        columns = {name: [] for name in fieldnames}
+        for row in reader:
+            for name in fieldnames:
+                columns[name].append(row.get(name) or "")
+    return fieldnames, columns
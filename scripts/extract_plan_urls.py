@@ -1,69 +1,72 @@
 import csv
 from pathlib import Path
-import openpyxl
-
-xlsx_path = Path(r"C:\Users\RicardoMartinezH\Downloads\OPP_ Portafolio C1 2026.xlsx")
-out_path = Path(r"C:\Users\RicardoMartinezH\ReCalc\scripts\programs_plan_urls.csv")
-
-
-def normalize_text(value: str) -> str:
-    return (
-        str(value or "")
-        .lower()
-        .encode("ascii", "ignore")
-        .decode("ascii")
-        .strip()
-    )
-
-
-def normalize_program_key(value: str) -> str:
-    normalized = normalize_text(value)
-    for prefix in (
-        "licenciatura en ",
-        "maestria en ",
-        "ingenieria en ",
-        "ingenieria ",
-        "licenciatura ",
-        "maestria ",
-    ):
-        if normalized.startswith(prefix):
-            normalized = normalized[len(prefix) :]
-            break
-    return " ".join(normalized.split()).strip()
-
-
-def to_title_case(value: str) -> str:
-    return " ".join(word[:1].upper() + word[1:].lower() for word in str(value).split())
-
-
-wb = openpyxl.load_workbook(xlsx_path, data_only=True)
-
-program_links = {}
-
-for sheet in wb.worksheets:
-    for row in sheet.iter_rows():
-        for cell in row:
-            if not cell.value or not isinstance(cell.value, str):
-                continue
-            value = cell.value.strip()
-            if not value:
-                continue
-            link = cell.hyperlink.target if cell.hyperlink else None
-            if not link:
-                continue
-            key = normalize_program_key(value)
-            if not key:
-                continue
-            if key in program_links:
-                continue
-            program_links[key] = (to_title_case(value), link)
-
-rows = sorted(program_links.values(), key=lambda x: (x[0].lower(), x[1]))
-
-out_path.parent.mkdir(parents=True, exist_ok=True)
-with out_path.open("w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow(["programa", "plan_url"])
-    writer.writerows(rows)
-
-print(f"wrote {len(rows)} rows to {out_path}")
+
+from normalization import normalize_program_key, to_title_case
+from workbook_snapshot import open_workbook
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+XLSX_PATH = Path(r"C:\Users\RicardoMartinezH\Downloads\OPP_ Portafolio C1 2026.xlsx")
+OUTPUT_PATH = BASE_DIR / "scripts" / "programs_plan_urls.csv"
+
+
+def collect_program_links(sheet, program_links):
+    for (r_idx, c_idx), link in sheet.links_by_cell.items():
+        value = sheet.rows[r_idx][c_idx]
+        if not value or not isinstance(value, str):
+            continue
+        value = value.strip()
+        if not value:
+            continue
+        key = normalize_program_key(value)
+        if not key:
+            continue
+        if key in program_links:
+            continue
+        program_links[key] = (to_title_case(value), link)
+    return program_links
+
+
+def plan_url_rows(program_links):
+    return sorted(program_links.values(), key=lambda x: (x[0].lower(), x[1]))
+
+
+def plan_urls_from_rows(rows):
+    plan_url_by_program = {}
+    for program, url in rows:
+        key = normalize_program_key(program)
+        if not key or not url:
+            continue
+        if key in plan_url_by_program:
+            continue
+        plan_url_by_program[key] = url
+    return plan_url_by_program
+
+
+def read_plan_urls(path: Path):
+    if not path.exists():
+        return []
+    with path.open("r", newline="", encoding="utf-8") as f:
+        return [(row.get("programa", ""), row.get("plan_url", "")) for row in csv.DictReader(f)]
+
+
+def write_plan_urls(rows, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["programa", "plan_url"])
+        writer.writerows(rows)
+
+
+def main():
+    program_links = {}
+    with open_workbook(XLSX_PATH) as wb:
+        for sheet in wb.iter_sheets():
+            collect_program_links(sheet, program_links)
+
+    rows = plan_url_rows(program_links)
+    write_plan_urls(rows, OUTPUT_PATH)
+    print(f"wrote {len(rows)} rows to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
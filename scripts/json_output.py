@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+COMPACT_SEPARATORS = (",", ":")
+PRETTY_INDENT = 2
+# Containers this deep are streamed piece by piece; anything deeper (one
+# availability entry, one benefit rule) is encoded in one call.
+STREAM_DEPTH = 2
+# Leaf list items are encoded this many at a time: one encode call per
+# item costs more than the encoding itself.
+STREAM_BATCH = 512
+READ_CHUNK = 1 << 20
+
+
+def make_encoder(pretty=False):
+    # allow_nan=False: NaN/Infinity are not JSON and JSON.parse rejects them.
+    if pretty:
+        return json.JSONEncoder(ensure_ascii=False, allow_nan=False, indent=PRETTY_INDENT)
+    return json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=COMPACT_SEPARATORS)
+
+
+def iter_json(value, pretty=False, encoder=None, depth=0):
+    """Text chunks that join to ``json.dumps(value)`` in the canonical encoding.
+
+    Compact is json.dumps with ``separators=(",", ":")``; pretty is ``indent=2``.
+    Both keep key order and non-ASCII text as is.
+    """
+    encoder = encoder or make_encoder(pretty)
+    indent = PRETTY_INDENT if pretty else 0
+    streamable = (
+        depth < STREAM_DEPTH
+        and isinstance(value, (dict, list))
+        and value
+        and not (isinstance(value, dict) and not all(isinstance(key, str) for key in value))
+    )
+    if not streamable:
+        text = encoder.encode(value)
+        # Nested pretty output is indented one level per depth; JSON strings
+        # never hold a raw newline, so every newline is structural.
+        yield text.replace("\n", "\n" + " " * (indent * depth)) if indent and depth else text
+        return
+    newline = "\n" + " " * (indent * (depth + 1)) if indent else ""
+    closing = "\n" + " " * (indent * depth) if indent else ""
+    key_separator = ": " if indent else ":"
+    if isinstance(value, dict):
+        yield "{"
+        for position, (key, item) in enumerate(value.items()):
+            yield ("," if position else "") + newline + encoder.encode(key) + key_separator
+            yield from iter_json(item, pretty, encoder, depth + 1)
+        yield closing + "}"
+    elif depth + 1 >= STREAM_DEPTH:
+        yield "["
+        for start in range(0, len(value), STREAM_BATCH):
+            # The batch's own brackets dropped; its items indented like ours.
+            text = encoder.encode(value[start : start + STREAM_BATCH])
+            items = text[1:-2].replace("\n", "\n" + " " * (indent * depth)) if indent else text[1:-1]
+            yield ("," if start else "") + items
+        yield closing + "]"
+    else:
+        yield "["
+        for position, item in enumerate(value):
+            yield ("," if position else "") + newline
+            yield from iter_json(item, pretty, encoder, depth + 1)
+        yield closing + "]"
+
+
+def dumps(value, pretty=False) -> str:
+    return "".join(iter_json(value, pretty))
+
+
+def file_digest(path: Path):
+    """sha256 hex digest of the file at ``path``, or None if there is none."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def write_chunks(chunks, path: Path):
+    """Write byte ``chunks`` to ``path`` atomically, skipping unchanged content.
+
+    The bytes go to a temporary file beside ``path`` and are hashed as they
+    are written. If ``path`` already holds the same bytes it is left
+    untouched (mtime included); otherwise the temporary file replaces it.
+    Returns {"path", "bytes", "hash", "written"}.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            for data in chunks:
+                digest.update(data)
+                size += len(data)
+                f.write(data)
+        content_hash = digest.hexdigest()
+        written = not (path.exists() and path.stat().st_size == size and file_digest(path) == content_hash)
+        if written:
+            os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return {"path": str(path), "bytes": size, "hash": content_hash, "written": written}
+
+
+def write_bytes(data: bytes, path: Path):
+    return write_chunks((data,), path)
+
+
+def write_json(value, path: Path, pretty=False):
+    """Stream ``value`` to ``path`` in the canonical encoding via write_chunks."""
+    return write_chunks((chunk.encode("utf-8") for chunk in iter_json(value, pretty)), path)
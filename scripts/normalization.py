@@ -0,0 +1,54 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Mirrors normalizeText / normalizeProgramKey in api/program-availability.ts:
+# lowercase, NFD, drop combining marks (U+0300-U+036F), JS-style trim.
+NORMALIZE_CACHE_SIZE = 65536
+COMBINING_MARKS = dict.fromkeys(range(0x0300, 0x0370))
+JS_WHITESPACE = (
+    "\t\n\v\f\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006"
+    "\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+)
+# The TS key applies each anchored prefix replace in turn; a chain of optional
+# groups in the same order strips exactly the same prefixes in one match.
+PROGRAM_PREFIX_RE = re.compile(
+    r"^(?:licenciatura\s+en\s+)?"
+    r"(?:maestria\s+en\s+)?"
+    r"(?:ingenieria\s+en\s+)?"
+    r"(?:ingenieria\s+)?"
+    r"(?:licenciatura\s+)?"
+    r"(?:maestria\s+)?"
+)
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_string(text: str) -> str:
+    lowered = text.lower()
+    if not lowered.isascii():
+        lowered = unicodedata.normalize("NFD", lowered).translate(COMBINING_MARKS)
+    return lowered.strip(JS_WHITESPACE)
+
+
+def normalize_text(value: str) -> str:
+    return normalize_string(str(value or ""))
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def program_key(text: str) -> str:
+    stripped = PROGRAM_PREFIX_RE.sub("", normalize_string(text), count=1)
+    return WHITESPACE_RE.sub(" ", stripped).strip(JS_WHITESPACE)
+
+
+def normalize_program_key(value: str) -> str:
+    return program_key(str(value or ""))
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def title_case(text: str) -> str:
+    return " ".join(word[:1].upper() + word[1:].lower() for word in text.split())
+
+
+def to_title_case(value: str) -> str:
+    return title_case(str(value))
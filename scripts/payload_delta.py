@@ -0,0 +1,169 @@
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+from json_output import dumps, write_json
+from normalization import normalize_program_key
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PAYLOAD_PATH = BASE_DIR / "scripts" / "availability_payload.json"
+PATCH_PATH = BASE_DIR / "scripts" / "availability_payload.patch.json"
+PATCH_FORMAT = "availability-patch"
+PATCH_VERSION = 1
+
+
+def serialize_payload(payload) -> str:
+    # Same text write_payload produces, so hashes match the files on disk.
+    return dumps(payload)
+
+
+def payload_hash(payload) -> str:
+    return hashlib.sha256(serialize_payload(payload).encode("utf-8")).hexdigest()
+
+
+def entry_identities(entries):
+    # plantel + program key + modalidad survives row inserts that shift the
+    # positional ids; the occurrence number tells apart the few repeats.
+    seen = {}
+    identities = []
+    for entry in entries:
+        base = (entry.get("plantel"), normalize_program_key(entry.get("programa")), entry.get("modalidad"))
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        identities.append([*base, occurrence])
+    return identities
+
+
+def field_changes(old, new):
+    change = {}
+    fields = {name: value for name, value in new.items() if name not in old or old[name] != value}
+    if fields:
+        change["fields"] = fields
+    dropped = [name for name in old if name not in new]
+    if dropped:
+        change["dropped"] = dropped
+    if list(new) != [name for name in old if name in new] + [name for name in new if name not in old]:
+        change["keys"] = list(new)
+    return change
+
+
+def apply_field_changes(entry, change):
+    updated = {name: value for name, value in entry.items() if name not in change.get("dropped", ())}
+    updated.update(change.get("fields", {}))
+    if "keys" in change:
+        updated = {name: updated[name] for name in change["keys"]}
+    return updated
+
+
+def diff_payloads(previous, current):
+    """Patch that turns ``previous`` into ``current`` (see apply_patch)."""
+    old_entries = previous.get("availability", [])
+    new_entries = current.get("availability", [])
+    old_index = {tuple(identity): idx for idx, identity in enumerate(entry_identities(old_entries))}
+    new_identities = entry_identities(new_entries)
+    new_keys = {tuple(identity) for identity in new_identities}
+
+    removed = [list(key) for key in old_index if key not in new_keys]
+    added = []
+    changed = []
+    for identity, entry in zip(new_identities, new_entries):
+        old_idx = old_index.get(tuple(identity))
+        if old_idx is None:
+            added.append({"key": identity, "entry": entry})
+            continue
+        change = field_changes(old_entries[old_idx], entry)
+        if change:
+            changed.append({"key": identity, **change})
+
+    patch = {
+        "format": PATCH_FORMAT,
+        "version": PATCH_VERSION,
+        "base": payload_hash(previous),
+        "target": payload_hash(current),
+        "removed": removed,
+        "added": added,
+        "changed": changed,
+    }
+    # Entries keep their previous order with additions appended; only when the
+    # new payload orders them differently is the full order shipped, as
+    # positions in that default sequence.
+    default_order = [key for key in old_index if key in new_keys] + [tuple(item["key"]) for item in added]
+    if default_order != [tuple(identity) for identity in new_identities]:
+        position = {key: idx for idx, key in enumerate(default_order)}
+        patch["order"] = [position[tuple(identity)] for identity in new_identities]
+    if list(current) != list(previous):
+        patch["sections"] = list(current)
+    for name in current:
+        if name != "availability" and current[name] != previous.get(name):
+            patch.setdefault("replace", {})[name] = current[name]
+    return patch
+
+
+def apply_patch(previous, patch, verify=True):
+    """Rebuild the full payload from ``previous`` and a diff_payloads patch."""
+    if patch.get("format") != PATCH_FORMAT or patch.get("version") != PATCH_VERSION:
+        raise ValueError(f"Unsupported patch: {patch.get('format')!r} v{patch.get('version')!r}")
+    if verify and payload_hash(previous) != patch["base"]:
+        raise ValueError("Patch base does not match the given payload")
+
+    old_entries = previous.get("availability", [])
+    entries = {tuple(key): entry for key, entry in zip(entry_identities(old_entries), old_entries)}
+    for key in patch["removed"]:
+        del entries[tuple(key)]
+    for change in patch["changed"]:
+        key = tuple(change["key"])
+        entries[key] = apply_field_changes(entries[key], change)
+    for item in patch["added"]:
+        entries[tuple(item["key"])] = item["entry"]
+    availability = list(entries.values())
+    if "order" in patch:
+        availability = [availability[idx] for idx in patch["order"]]
+
+    replaced = patch.get("replace", {})
+    payload = {}
+    for name in patch.get("sections", list(previous)):
+        payload[name] = availability if name == "availability" else replaced.get(name, previous.get(name))
+    if verify and payload_hash(payload) != patch["target"]:
+        raise ValueError("Patched payload does not match the patch target")
+    return payload
+
+
+def patch_summary(patch) -> str:
+    return f"+{len(patch['added'])} -{len(patch['removed'])} ~{len(patch['changed'])}"
+
+
+def load_json(path: Path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff availability payloads or apply a patch to one.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    diff = sub.add_parser("diff", help="write the patch from PREVIOUS to CURRENT")
+    diff.add_argument("previous", type=Path)
+    diff.add_argument("current", type=Path, nargs="?", default=PAYLOAD_PATH)
+    diff.add_argument("--output", type=Path, default=PATCH_PATH)
+    apply = sub.add_parser("apply", help="rebuild the full payload from PREVIOUS and PATCH")
+    apply.add_argument("previous", type=Path)
+    apply.add_argument("patch", type=Path, nargs="?", default=PATCH_PATH)
+    apply.add_argument("--output", type=Path, help="payload path (default: print to stdout)")
+    args = parser.parse_args(argv)
+
+    if args.command == "diff":
+        patch = diff_payloads(load_json(args.previous), load_json(args.current))
+        written = write_json(patch, args.output)
+        print(f"Wrote {args.output} ({patch_summary(patch)}, {written['bytes']} bytes)")
+        return
+    try:
+        payload = apply_patch(load_json(args.previous), load_json(args.patch))
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    if args.output:
+        write_json(payload, args.output)
+    else:
+        print(serialize_payload(payload))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+from json_output import dumps, write_bytes, write_json
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped without the package
+    brotli = None
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PAYLOAD_PATH = BASE_DIR / "scripts" / "availability_payload.json"
+ENCODED_PATH = BASE_DIR / "scripts" / "availability_payload.dict.json"
+ENCODED_FORMAT = "availability-dict"
+ENCODED_VERSION = 1
+SECTIONS = ("availability", "debug")
+
+
+def encode_records(records, strings, string_ids):
+    # Records become one column per field. A column whose values are all
+    # strings holds indexes into the shared string table; any other column
+    # keeps its values as they are. Records with a different key set or key
+    # order get their own shape so the decoder restores them exactly.
+    shapes = []
+    shape_ids = {}
+    shape_column = []
+    fields = []
+    for record in records:
+        shape = tuple(record)
+        if shape not in shape_ids:
+            shape_ids[shape] = len(shapes)
+            shapes.append(list(shape))
+            fields.extend(name for name in shape if name not in fields)
+        shape_column.append(shape_ids[shape])
+
+    columns = {}
+    string_fields = []
+    for name in fields:
+        values = [record.get(name) for record in records]
+        present = [record[name] for record in records if name in record]
+        if present and all(isinstance(value, str) for value in present):
+            string_fields.append(name)
+            column = []
+            for record in records:
+                if name not in record:
+                    column.append(-1)
+                    continue
+                value = record[name]
+                idx = string_ids.get(value)
+                if idx is None:
+                    idx = string_ids[value] = len(strings)
+                    strings.append(value)
+                column.append(idx)
+            columns[name] = column
+        else:
+            columns[name] = values
+    encoded = {"count": len(records), "shapes": shapes, "stringFields": string_fields, "columns": columns}
+    if len(shapes) > 1:
+        encoded["shape"] = shape_column
+    return encoded
+
+
+def decode_records(encoded, strings):
+    shapes = encoded["shapes"]
+    shape_column = encoded.get("shape")
+    string_fields = set(encoded["stringFields"])
+    columns = encoded["columns"]
+    records = []
+    for idx in range(encoded["count"]):
+        shape = shapes[shape_column[idx] if shape_column else 0]
+        records.append(
+            {name: strings[columns[name][idx]] if name in string_fields else columns[name][idx] for name in shape}
+        )
+    return records
+
+
+def encode_payload(payload):
+    """Dictionary-encode a {"availability": [...], "debug": [...]} payload."""
+    extra = [key for key in payload if key not in SECTIONS]
+    if extra:
+        raise ValueError(f"Unsupported payload keys: {', '.join(extra)}")
+    strings = []
+    string_ids = {}
+    sections = {
+        name: encode_records(payload[name], strings, string_ids) for name in SECTIONS if name in payload
+    }
+    return {
+        "format": ENCODED_FORMAT,
+        "version": ENCODED_VERSION,
+        "order": list(payload),
+        "strings": strings,
+        **sections,
+    }
+
+
+def decode_payload(encoded):
+    """Rebuild the exact payload that encode_payload was given."""
+    if encoded.get("format") != ENCODED_FORMAT or encoded.get("version") != ENCODED_VERSION:
+        raise ValueError(f"Unsupported encoded payload: {encoded.get('format')!r} v{encoded.get('version')!r}")
+    return {name: decode_records(encoded[name], encoded["strings"]) for name in encoded["order"]}
+
+
+def serialize_encoded(encoded) -> bytes:
+    # Keys are emitted in the fixed order encode_payload builds them (nested
+    # debug values keep theirs, as the decoder must restore them), so equal
+    # payloads give equal bytes and the same ETag.
+    return dumps(encoded).encode("utf-8")
+
+
+def content_etag(data: bytes) -> str:
+    return f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+
+
+def compressed_variants(data: bytes):
+    # mtime=0 so the gzip bytes only depend on the content.
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return variants
+
+
+def write_encoded_payload(payload, path: Path = ENCODED_PATH):
+    """Write the encoded payload, its .gz/.br variants and an .etag file.
+
+    Each file is replaced atomically and only when its content changed.
+    """
+    encoded = encode_payload(payload)
+    data = serialize_encoded(encoded)
+    write_json(encoded, path)
+    etag = content_etag(data)
+    written = {"identity": len(data)}
+    suffixes = {"gzip": ".gz", "br": ".br"}
+    for encoding, compressed in compressed_variants(data).items():
+        write_bytes(compressed, path.with_name(path.name + suffixes[encoding]))
+        written[encoding] = len(compressed)
+    write_bytes(etag.encode("utf-8"), path.with_name(path.name + ".etag"))
+    return {"etag": etag, "bytes": written}
+
+
+def load_encoded(path: Path):
+    data = Path(path).read_bytes()
+    if path.suffix == ".gz":
+        data = gzip.decompress(data)
+    elif path.suffix == ".br":
+        if brotli is None:
+            raise RuntimeError("Reading .br payloads needs the brotli package: pip install brotli")
+        data = brotli.decompress(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encode or decode the dictionary-encoded availability payload.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    encode = sub.add_parser("encode", help="encode a plain availability payload")
+    encode.add_argument("payload", type=Path, nargs="?", default=PAYLOAD_PATH)
+    encode.add_argument("--output", type=Path, default=ENCODED_PATH)
+    decode = sub.add_parser("decode", help="decode an encoded payload (.json, .gz or .br)")
+    decode.add_argument("encoded", type=Path, nargs="?", default=ENCODED_PATH)
+    decode.add_argument("--output", type=Path, help="plain payload path (default: print to stdout)")
+    verify = sub.add_parser("verify", help="check that an encoded payload decodes to the plain one byte for byte")
+    verify.add_argument("encoded", type=Path, nargs="?", default=ENCODED_PATH)
+    verify.add_argument("--payload", type=Path, default=PAYLOAD_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "encode":
+        payload = json.loads(args.payload.read_text(encoding="utf-8"))
+        info = write_encoded_payload(payload, args.output)
+        print(f"Wrote {args.output} {info['bytes']} etag={info['etag']}")
+    elif args.command == "decode":
+        payload = decode_payload(load_encoded(args.encoded))
+        if args.output:
+            write_json(payload, args.output)
+        else:
+            print(dumps(payload))
+    else:
+        # The builders write the canonical compact encoding; a payload written
+        # with --pretty still has to hold the same data.
+        decoded = decode_payload(load_encoded(args.encoded))
+        text = args.payload.read_text(encoding="utf-8")
+        if dumps(decoded) != text and dumps(decoded, pretty=True) != text:
+            raise SystemExit(f"{args.encoded} does not decode to {args.payload}")
+        print(f"{args.encoded} decodes to {args.payload} exactly")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import hashlib
+import json
+import re
+from collections import Counter
+from pathlib import Path
+
+from json_output import dumps, write_bytes, write_json
+from normalization import normalize_text
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PAYLOAD_PATH = BASE_DIR / "scripts" / "availability_payload.json"
+SHARDS_DIR = BASE_DIR / "scripts" / "availability_shards"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+ONLINE_SHARD = "online"
+SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def shard_slug(plantel: str) -> str:
+    return SLUG_RE.sub("-", normalize_text(plantel)).strip("-") or "plantel"
+
+
+def partition_entries(availability):
+    """(plantel, entries) per plantel in first-seen order, then the online shard."""
+    planteles = {}
+    online = []
+    for entry in availability:
+        if entry["modalidad"] == "online":
+            online.append(entry)
+        else:
+            planteles.setdefault(entry["plantel"], []).append(entry)
+    return list(planteles.items()), online
+
+
+def serialize_shard(document) -> bytes:
+    return dumps(document).encode("utf-8")
+
+
+def write_shards(payload, directory: Path = SHARDS_DIR, source=None):
+    """Write one shard per plantel, the online shard and manifest.json.
+
+    ``source`` is the {"bytes", "hash"} of the monolithic payload as written
+    in the same run (what write_json returns); its hash in the manifest ties
+    every shard to that file.
+    """
+    if source is None:
+        data = dumps(payload).encode("utf-8")
+        source = {"bytes": len(data), "hash": content_hash(data)}
+    planteles, online = partition_entries(payload["availability"])
+    directory.mkdir(parents=True, exist_ok=True)
+    previous_files = manifest_files(directory)
+
+    # The online and manifest file names are reserved so no plantel slug can take them.
+    used = {ONLINE_SHARD, Path(MANIFEST_NAME).stem}
+
+    def unique_slug(plantel):
+        base = slug = shard_slug(plantel)
+        suffix = 1
+        while slug in used:
+            suffix += 1
+            slug = f"{base}-{suffix}"
+        used.add(slug)
+        return slug
+
+    def write(slug, plantel, entries):
+        data = serialize_shard({"plantel": plantel, "availability": entries})
+        path = directory / f"{slug}.json"
+        write_bytes(data, path)
+        return {
+            "plantel": plantel,
+            "file": path.name,
+            "entries": len(entries),
+            "bytes": len(data),
+            "hash": content_hash(data),
+        }
+
+    shards = [write(unique_slug(plantel), plantel, entries) for plantel, entries in planteles]
+    online_shard = write(ONLINE_SHARD, "Online", online)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "source": {
+            "entries": len(payload["availability"]),
+            "bytes": source["bytes"],
+            "hash": source["hash"],
+        },
+        "shards": shards,
+        "online": online_shard,
+    }
+    write_json(manifest, directory / MANIFEST_NAME, pretty=True)
+
+    # Only shards this writer listed before are removed: the directory may
+    # hold other files (it could even be scripts/ itself).
+    current = {item["file"] for item in shards} | {online_shard["file"]}
+    for name in previous_files - current:
+        (directory / name).unlink(missing_ok=True)
+    return manifest
+
+
+def manifest_files(directory: Path):
+    """Shard file names listed in the manifest already in ``directory``."""
+    try:
+        manifest = json.loads((directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+        items = [*manifest["shards"], manifest["online"]]
+        names = {item["file"] for item in items}
+    except (OSError, ValueError, KeyError, TypeError):
+        return set()
+    # A manifest that names anything but a plain .json file here is not ours.
+    return {name for name in names if isinstance(name, str) and Path(name).name == name and name.endswith(".json")}
+
+
+def verify_shards(directory: Path = SHARDS_DIR, payload_path: Path = PAYLOAD_PATH):
+    """Problems found checking the shards against their manifest and source."""
+    problems = []
+    manifest = json.loads((directory / MANIFEST_NAME).read_text(encoding="utf-8"))
+    source = payload_path.read_bytes()
+    if content_hash(source) != manifest["source"]["hash"]:
+        problems.append(f"{payload_path.name} is not the payload these shards were built from")
+    sharded = Counter()
+    for item in [*manifest["shards"], manifest["online"]]:
+        data = (directory / item["file"]).read_bytes()
+        if len(data) != item["bytes"] or content_hash(data) != item["hash"]:
+            problems.append(f"{item['file']} does not match its manifest entry")
+            continue
+        entries = json.loads(data)["availability"]
+        if len(entries) != item["entries"]:
+            problems.append(f"{item['file']} has {len(entries)} entries, manifest says {item['entries']}")
+        sharded.update(json.dumps(entry, ensure_ascii=False, sort_keys=True) for entry in entries)
+    expected = Counter(
+        json.dumps(entry, ensure_ascii=False, sort_keys=True) for entry in json.loads(source)["availability"]
+    )
+    if sharded != expected:
+        problems.append("shards do not hold exactly the entries of the monolithic payload")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split the availability payload into per-plantel shards.")
+    parser.add_argument("payload", type=Path, nargs="?", default=PAYLOAD_PATH)
+    parser.add_argument("--output", type=Path, default=SHARDS_DIR, help="shard directory")
+    parser.add_argument("--check", action="store_true", help="verify existing shards instead of writing them")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        problems = verify_shards(args.output, args.payload)
+        for problem in problems:
+            print(f"ERROR {problem}")
+        if problems:
+            raise SystemExit(1)
+        print(f"Shards in {args.output} match {args.payload}")
+        return
+    data = args.payload.read_bytes()
+    manifest = write_shards(json.loads(data), args.output, {"bytes": len(data), "hash": content_hash(data)})
+    print(f"Wrote {len(manifest['shards'])} plantel shards and the online shard to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
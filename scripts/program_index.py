@@ -0,0 +1,78 @@
+import math
+
+GRAM_SIZE = 3
+DEFAULT_THRESHOLD = 0.85
+
+
+def grams(key: str):
+    padded = f" {key} "
+    return {padded[idx : idx + GRAM_SIZE] for idx in range(len(padded) - GRAM_SIZE + 1)}
+
+
+def check_threshold(threshold: float) -> float:
+    # The candidate bounds divide by the threshold and by 2 - threshold.
+    if not 0 < threshold <= 1:
+        raise ValueError(f"Similarity threshold must be in (0, 1], got {threshold!r}")
+    return threshold
+
+
+def dice(overlap: int, left: int, right: int) -> float:
+    return 2 * overlap / (left + right) if left + right else 0.0
+
+
+class ProgramIndex:
+    """Character-trigram postings over normalized program keys.
+
+    ``search`` returns the keys whose trigram Dice similarity with the query is
+    at least ``threshold``. Only keys sharing one of the query's rarest grams
+    are scored (prefix filtering): a key that misses all of them cannot reach
+    the overlap the threshold demands, so lookups touch a small slice of the
+    postings however many programs are indexed.
+    """
+
+    def __init__(self, keys=()):
+        self.keys = []
+        self.key_grams = []
+        self.postings = {}
+        for key in keys:
+            self.add(key)
+
+    def add(self, key: str):
+        key_id = len(self.keys)
+        key_grams = grams(key)
+        self.keys.append(key)
+        self.key_grams.append(key_grams)
+        for gram in key_grams:
+            self.postings.setdefault(gram, []).append(key_id)
+        return key_id
+
+    def search(self, key: str, threshold: float = DEFAULT_THRESHOLD):
+        """[(score, key)] best first, ties in insertion order."""
+        check_threshold(threshold)
+        query = grams(key)
+        if not query:
+            return []
+        # Dice >= t implies Jaccard >= t / (2 - t), which needs an overlap of
+        # at least ceil(jaccard * |query|) grams.
+        jaccard = threshold / (2 - threshold)
+        needed = max(1, math.ceil(jaccard * len(query) - 1e-9))
+        ordered = sorted(query, key=lambda gram: (len(self.postings.get(gram, ())), gram))
+        candidates = set()
+        for gram in ordered[: len(query) - needed + 1]:
+            candidates.update(self.postings.get(gram, ()))
+
+        matches = []
+        for key_id in candidates:
+            key_grams = self.key_grams[key_id]
+            # Length filter: too short or too long to reach the threshold.
+            if not jaccard * len(query) - 1e-9 <= len(key_grams) <= len(query) / jaccard + 1e-9:
+                continue
+            score = dice(len(query & key_grams), len(query), len(key_grams))
+            if score >= threshold:
+                matches.append((score, key_id))
+        matches.sort(key=lambda item: (-item[0], item[1]))
+        return [(round(score, 4), self.keys[key_id]) for score, key_id in matches]
+
+    def best(self, key: str, threshold: float = DEFAULT_THRESHOLD):
+        matches = self.search(key, threshold)
+        return matches[0] if matches else None
@@ -0,0 +1,114 @@
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+
+from normalization import normalize_text
+
+# Header/section markers the availability builders look for.
+INDEX_TOKENS = (
+    "c1",
+    "2026",
+    "escolarizado",
+    "ejecutivo",
+    "horarios",
+    "online",
+    "licenciatura",
+    "posgrados",
+    "maestria",
+)
+# Streamed rows share this memo instead of a per-sheet one, so it stays
+# bounded however many distinct cells a workbook has.
+ROW_MEMO_SIZE = 4096
+
+
+class SheetGrid:
+    """A sheet's cells as text, normalized once, with a token -> cell index.
+
+    ``contains[token]`` lists every (row, col) whose normalized text contains
+    the token and ``equals[token]`` those whose text is exactly the token, both
+    in row-major order so row/column searches are bisections.
+    """
+
+    def __init__(self, rows, tokens=INDEX_TOKENS):
+        self.rows = rows
+        self.text = []
+        self.normalized = []
+        self.contains = {token: [] for token in tokens}
+        self.equals = {token: [] for token in tokens}
+        self._row_cache = {}
+        memo = {}
+        for r_idx, row in enumerate(rows):
+            text_row = [str(cell or "") for cell in row]
+            normalized_row = []
+            for c_idx, text in enumerate(text_row):
+                normalized = memo.get(text)
+                if normalized is None:
+                    normalized = memo[text] = normalize_text(text)
+                normalized_row.append(normalized)
+                if not normalized:
+                    continue
+                for token in tokens:
+                    if token in normalized:
+                        self.contains[token].append((r_idx, c_idx))
+                        if normalized == token:
+                            self.equals[token].append((r_idx, c_idx))
+            self.text.append(text_row)
+            self.normalized.append(normalized_row)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def cells(self, token, exact=False):
+        return (self.equals if exact else self.contains)[token]
+
+    def token_rows(self, token, exact=False):
+        key = (token, exact)
+        rows = self._row_cache.get(key)
+        if rows is None:
+            rows = sorted({r_idx for r_idx, _ in self.cells(token, exact)})
+            self._row_cache[key] = rows
+        return rows
+
+    def first_row(self, token, start=0, stop=None, exact=False) -> int:
+        rows = self.token_rows(token, exact)
+        pos = bisect_left(rows, start)
+        if pos < len(rows) and (stop is None or rows[pos] < stop):
+            return rows[pos]
+        return -1
+
+    def row_cols(self, token, r_idx, exact=False):
+        cells = self.cells(token, exact)
+        lo = bisect_left(cells, (r_idx, -1))
+        hi = bisect_left(cells, (r_idx + 1, -1), lo)
+        return [c_idx for _, c_idx in cells[lo:hi]]
+
+
+class GridRow:
+    """One streamed row's text and normalized text (SheetGrid for one row)."""
+
+    __slots__ = ("text", "normalized")
+
+    def __init__(self, row):
+        self.text = [str(cell or "") for cell in row]
+        self.normalized = [normalize_cell(text) for text in self.text]
+
+    def cell(self, c_idx) -> str:
+        # Streamed rows are not padded to the sheet width.
+        return self.text[c_idx] if 0 <= c_idx < len(self.text) else ""
+
+    def cols(self, token, exact=False):
+        if exact:
+            return [c_idx for c_idx, normalized in enumerate(self.normalized) if normalized == token]
+        return [c_idx for c_idx, normalized in enumerate(self.normalized) if token in normalized]
+
+    def has(self, token, exact=False) -> bool:
+        return bool(self.cols(token, exact))
+
+
+@lru_cache(maxsize=ROW_MEMO_SIZE)
+def normalize_cell(text: str) -> str:
+    return normalize_text(text)
+
+
+def next_after(sorted_values, value):
+    pos = bisect_right(sorted_values, value)
+    return sorted_values[pos] if pos < len(sorted_values) else None
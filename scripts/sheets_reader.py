@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import re
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from json_output import write_json
+from xlsx_reader import WINDOWS_EPOCH, SheetData
+
+try:
+    import google.auth
+    from google.auth.transport.requests import Request as GoogleAuthRequest
+    from google.oauth2 import service_account
+except ImportError:  # only needed to mint tokens from a service account
+    google = None
+
+SHEETS_ENDPOINT = os.environ.get("GOOGLE_SHEETS_ENDPOINT", "https://sheets.googleapis.com")
+SHEET_ID = os.environ.get("GOOGLE_SHEET_AVAILABILITY_ID", "1LffTC1go3FFGPcSIEuhK0grDKH2WOEmW79jz_8JrAlo")
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+# Everything the builders read, for every sheet, in one request.
+GRID_FIELDS = (
+    "sheets(properties.title,"
+    "data(rowData.values(effectiveValue,formattedValue,effectiveFormat.numberFormat.type,"
+    "hyperlink,textFormatRuns.format.link.uri,userEnteredValue.formulaValue),"
+    "rowMetadata(hiddenByUser,hiddenByFilter)))"
+)
+HYPERLINK_FORMULA_RE = re.compile(r'HYPERLINK\("([^"]+)"[;,]', re.IGNORECASE)
+REQUEST_TIMEOUT = 60
+
+
+def access_token(token=None):
+    """Bearer token: ``token``, GOOGLE_SHEETS_ACCESS_TOKEN, or one minted from
+    the GOOGLE_SHEETS_SERVICE_ACCOUNT_JSON service account. None sends no
+    Authorization header (a local stand-in needs none)."""
+    token = token or os.environ.get("GOOGLE_SHEETS_ACCESS_TOKEN")
+    if token:
+        return token
+    credentials_json = os.environ.get("GOOGLE_SHEETS_SERVICE_ACCOUNT_JSON")
+    if not credentials_json:
+        return None
+    if google is None:
+        raise RuntimeError("Service account tokens need google-auth: pip install google-auth requests")
+    credentials = service_account.Credentials.from_service_account_info(json.loads(credentials_json), scopes=SCOPES)
+    credentials.refresh(GoogleAuthRequest())
+    return credentials.token
+
+
+def spreadsheet_url(spreadsheet_id=SHEET_ID, endpoint=SHEETS_ENDPOINT) -> str:
+    query = urllib.parse.urlencode({"includeGridData": "true", "fields": GRID_FIELDS})
+    return f"{endpoint.rstrip('/')}/v4/spreadsheets/{urllib.parse.quote(spreadsheet_id)}?{query}"
+
+
+def fetch_spreadsheet(spreadsheet_id=SHEET_ID, endpoint=SHEETS_ENDPOINT, token=None):
+    """The spreadsheet's grid data (values, links, hidden rows) for all sheets."""
+    request = urllib.request.Request(spreadsheet_url(spreadsheet_id, endpoint))
+    token = access_token(token)
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as exc:
+        raise RuntimeError(f"Failed to load spreadsheet {spreadsheet_id} ({exc.code}).") from exc
+
+
+def cell_link(cell) -> str:
+    # Same precedence as extractCellLink in api/program-availability.ts.
+    if cell.get("hyperlink"):
+        return cell["hyperlink"]
+    for run in cell.get("textFormatRuns", ()):
+        uri = run.get("format", {}).get("link", {}).get("uri")
+        if uri:
+            return uri
+    formula = cell.get("userEnteredValue", {}).get("formulaValue")
+    if formula:
+        match = HYPERLINK_FORMULA_RE.search(formula)
+        if match:
+            return match.group(1)
+    return ""
+
+
+def cell_value(cell):
+    # Typed like the xlsx reader: whole numbers as int, date/time formats as
+    # datetime/time, text as str, checkboxes as bool.
+    value = cell.get("effectiveValue")
+    if not value:
+        return cell.get("formattedValue")
+    if "stringValue" in value:
+        return value["stringValue"]
+    if "boolValue" in value:
+        return value["boolValue"]
+    if "errorValue" in value:
+        return cell.get("formattedValue")
+    number = value.get("numberValue")
+    if number is None:
+        return None
+    kind = cell.get("effectiveFormat", {}).get("numberFormat", {}).get("type")
+    if kind in ("DATE", "DATE_TIME"):
+        return WINDOWS_EPOCH + timedelta(days=number)
+    if kind == "TIME":
+        return (WINDOWS_EPOCH + timedelta(days=number % 1)).time()
+    return int(number) if float(number).is_integer() else number
+
+
+def sheet_data(sheet) -> SheetData:
+    name = sheet.get("properties", {}).get("title", "")
+    grid = (sheet.get("data") or [{}])[0]
+    rows = []
+    links_by_row = {}
+    links_by_cell = {}
+    for r_idx, row_data in enumerate(grid.get("rowData", ())):
+        row = []
+        for c_idx, cell in enumerate(row_data.get("values", ())):
+            row.append(cell_value(cell))
+            link = cell_link(cell)
+            if link:
+                links_by_cell[(r_idx, c_idx)] = link
+                links_by_row.setdefault(r_idx, link)
+        rows.append(row)
+    # The API trims each row after its last cell; pad them like the xlsx reader.
+    width = max((len(row) for row in rows), default=0)
+    for row in rows:
+        row.extend([None] * (width - len(row)))
+    hidden_rows = {
+        r_idx
+        for r_idx, meta in enumerate(grid.get("rowMetadata", ()))
+        if r_idx < len(rows) and (meta.get("hiddenByUser") or meta.get("hiddenByFilter"))
+    }
+    return SheetData(name, rows, links_by_row, links_by_cell, hidden_rows)
+
+
+class SheetsWorkbook:
+    """XlsxWorkbook stand-in over a spreadsheet fetched from the Sheets API.
+
+    The whole spreadsheet arrives in one response; sheets are converted to
+    SheetData as they are read.
+    """
+
+    def __init__(self, document):
+        self._sheets = {sheet.get("properties", {}).get("title", ""): sheet for sheet in document.get("sheets", ())}
+        self.sheetnames = list(self._sheets)
+
+    @classmethod
+    def fetch(cls, spreadsheet_id=SHEET_ID, endpoint=SHEETS_ENDPOINT, token=None):
+        return cls(fetch_spreadsheet(spreadsheet_id, endpoint, token))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def iter_sheets(self):
+        for name in self.sheetnames:
+            yield self.read_sheet(name)
+
+    def read_sheet(self, name: str) -> SheetData:
+        return sheet_data(self._sheets[name])
+
+
+def serve_fixture(fixture: Path, port: int):
+    """Answer every spreadsheet GET with a recorded response, like the API."""
+    body = fixture.read_bytes()
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if not urllib.parse.urlsplit(self.path).path.startswith("/v4/spreadsheets/"):
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    print(f"Serving {fixture} at http://127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record the portfolio spreadsheet or serve a recording locally.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    record = sub.add_parser("record", help="save the grid-data response as a fixture")
+    record.add_argument("output", type=Path)
+    record.add_argument("--sheet-id", default=SHEET_ID)
+    record.add_argument("--endpoint", default=SHEETS_ENDPOINT)
+    serve = sub.add_parser("serve", help="serve a recorded fixture as a local Sheets API stand-in")
+    serve.add_argument("fixture", type=Path)
+    serve.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        document = fetch_spreadsheet(args.sheet_id, args.endpoint)
+        write_json(document, args.output)
+        print(f"Wrote {len(document.get('sheets', []))} sheets to {args.output}")
+    else:
+        serve_fixture(args.fixture, args.port)
+
+
+if __name__ == "__main__":
+    main()
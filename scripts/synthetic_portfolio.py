@@ -0,0 +1,245 @@
+import csv
+import random
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+from build_availability_from_xlsx import ONLINE_ALLOWLIST
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+WORKSHEET_TYPE = f"{REL_NS}/worksheet"
+HYPERLINK_TYPE = f"{REL_NS}/hyperlink"
+
+HORARIOS = (
+    "Lunes a viernes 7:00 am a 2:00 pm",
+    "Lunes a viernes 6:00 pm a 10:00 pm",
+    "Sábados 8:00 am a 2:00 pm",
+    "",
+)
+MODALIDADES = ("Presencial", "Mixta", "Ejecutiva", "Online", "")
+
+
+def column_letters(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def plantel_names(count: int):
+    return [f"Plantel {idx:03d}" for idx in range(1, count + 1)]
+
+
+def program_names(count: int):
+    names = list(ONLINE_ALLOWLIST)
+    idx = 0
+    while len(names) < count:
+        idx += 1
+        names.append(f"Licenciatura en Programa Sintético {idx}")
+    return names[:count]
+
+
+def plan_url(rng) -> str:
+    token = "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-") for _ in range(33))
+    return f"https://drive.google.com/file/d/{token}/view?usp=drive_link"
+
+
+def plantel_sheet(rng, programs, hidden_every=7):
+    # Mirrors the plantel layout: C1/2026 header with a Horarios column, a
+    # year row, the Escolarizado/Ejecutivo row, program rows, then Horarios.
+    rows = [
+        ["", "OFERTA C1 2026", "", "", "", "", "Horarios", "", ""],
+        ["", "", "2026", "", "", "", "", "", ""],
+        ["", "Programa", "Escolarizado", "Ejecutivo", "", "", "", "Escolarizado", "Ejecutivo"],
+    ]
+    links = {}
+    hidden = set()
+    for idx, programa in enumerate(programs):
+        r_idx = len(rows)
+        escolarizado = rng.random() < 0.7
+        ejecutivo = rng.random() < 0.5
+        rows.append(
+            [
+                "",
+                programa,
+                "✓" if escolarizado else "",
+                "Si" if ejecutivo else "",
+                "",
+                "",
+                "",
+                rng.choice(HORARIOS) if escolarizado else "",
+                rng.choice(HORARIOS) if ejecutivo else "",
+            ]
+        )
+        if rng.random() < 0.8:
+            links[(r_idx, 1)] = plan_url(rng)
+        if hidden_every and idx % hidden_every == hidden_every - 1:
+            hidden.add(r_idx)
+    rows.append(["", "Horarios", "", "", "", "", "", "", ""])
+    rows.append(["", "Turno matutino", "Lunes a viernes", "", "", "", "", "", ""])
+    return rows, links, hidden
+
+
+def online_sheet(rng, programs):
+    half = max(1, len(programs) // 2)
+    rows = [["Licenciatura Online", ""]]
+    links = {}
+    for programa in programs[:half]:
+        links[(len(rows), 0)] = plan_url(rng)
+        rows.append([programa, ""])
+    rows.append(["", ""])
+    rows.append(["Posgrados Online", ""])
+    for programa in programs[half:]:
+        links[(len(rows), 0)] = plan_url(rng)
+        rows.append([programa, ""])
+    return rows, links, set()
+
+
+def sheet_xml(rows, links, hidden, shared):
+    parts = [f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheetData>']
+    for r_idx, row in enumerate(rows):
+        hidden_attr = ' hidden="1"' if r_idx in hidden else ""
+        parts.append(f'<row r="{r_idx + 1}"{hidden_attr}>')
+        for c_idx, value in enumerate(row):
+            if value == "":
+                continue
+            ref = f"{column_letters(c_idx)}{r_idx + 1}"
+            idx = shared.setdefault(value, len(shared))
+            parts.append(f'<c r="{ref}" t="s"><v>{idx}</v></c>')
+        parts.append("</row>")
+    parts.append("</sheetData>")
+    rels = []
+    if links:
+        parts.append("<hyperlinks>")
+        for link_idx, ((r_idx, c_idx), target) in enumerate(sorted(links.items()), start=1):
+            parts.append(f'<hyperlink ref="{column_letters(c_idx)}{r_idx + 1}" r:id="rId{link_idx}"/>')
+            rels.append(
+                f'<Relationship Id="rId{link_idx}" Type="{HYPERLINK_TYPE}" '
+                f'Target={quoteattr(target)} TargetMode="External"/>'
+            )
+        parts.append("</hyperlinks>")
+    parts.append("</worksheet>")
+    rels_xml = f'<Relationships xmlns="{PKG_REL_NS}">{"".join(rels)}</Relationships>' if rels else None
+    return "".join(parts), rels_xml
+
+
+def write_workbook(path: Path, sheets):
+    # sheets: list of (name, rows, links_by_cell, hidden_rows)
+    shared = {}
+    sheet_parts = [sheet_xml(rows, links, hidden, shared) for _, rows, links, hidden in sheets]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        overrides = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{idx}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for idx in range(1, len(sheets) + 1)
+        )
+        zf.writestr(
+            "[Content_Types].xml",
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/sharedStrings.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            f"{overrides}</Types>",
+        )
+        zf.writestr(
+            "_rels/.rels",
+            f'<Relationships xmlns="{PKG_REL_NS}"><Relationship Id="rId1" '
+            f'Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>',
+        )
+        sheet_entries = "".join(
+            f'<sheet name={quoteattr(name)} sheetId="{idx}" r:id="rId{idx}"/>'
+            for idx, (name, *_rest) in enumerate(sheets, start=1)
+        )
+        zf.writestr(
+            "xl/workbook.xml",
+            f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets>{sheet_entries}</sheets></workbook>',
+        )
+        workbook_rels = "".join(
+            f'<Relationship Id="rId{idx}" Type="{WORKSHEET_TYPE}" Target="worksheets/sheet{idx}.xml"/>'
+            for idx in range(1, len(sheets) + 1)
+        )
+        zf.writestr("xl/_rels/workbook.xml.rels", f'<Relationships xmlns="{PKG_REL_NS}">{workbook_rels}</Relationships>')
+        strings = "".join(f'<si><t xml:space="preserve">{escape(value)}</t></si>' for value in shared)
+        zf.writestr(
+            "xl/sharedStrings.xml",
+            f'<sst xmlns="{MAIN_NS}" count="{len(shared)}" uniqueCount="{len(shared)}">{strings}</sst>',
+        )
+        for idx, (xml, rels_xml) in enumerate(sheet_parts, start=1):
+            zf.writestr(f"xl/worksheets/sheet{idx}.xml", xml)
+            if rels_xml:
+                zf.writestr(f"xl/worksheets/_rels/sheet{idx}.xml.rels", rels_xml)
+
+
+def generate_portfolio(path: Path, plantel_count: int, programs_per_sheet: int = 40, seed: int = 2026):
+    rng = random.Random(seed)
+    programs = program_names(max(programs_per_sheet, len(ONLINE_ALLOWLIST)))
+    sheets = [("Oferta General", [["Oferta General"]], {}, set())]
+    for name in plantel_names(plantel_count):
+        rows, links, hidden = plantel_sheet(rng, rng.sample(programs, programs_per_sheet))
+        sheets.append((name, rows, links, hidden))
+    rows, links, hidden = online_sheet(rng, programs)
+    sheets.append(("Online", rows, links, hidden))
+    write_workbook(path, sheets)
+    return path
+
+
+def percent(rng) -> str:
+    return f"{rng.choice((5, 10, 15, 20, 25, 30))}%"
+
+
+def generate_price_csvs(directory: Path, row_count: int, plantel_count: int = 50, seed: int = 2026):
+    # Column positions follow the OPP precios exports read by
+    # build_benefit_rules_from_csvs.py (plantel at 2 / 8, salud at 9,
+    # licenciatura apply/modalidad/percent at 12-14, bachillerato at 14-17).
+    rng = random.Random(seed)
+    planteles = plantel_names(plantel_count)
+    directory.mkdir(parents=True, exist_ok=True)
+    lic_path = directory / "precios_licenciatura.csv"
+    lic_online_path = directory / "precios_lic_online.csv"
+    bach_path = directory / "precios_bachillerato.csv"
+
+    def lic_row():
+        row = [""] * 15
+        row[2] = rng.choice(planteles)
+        row[9] = percent(rng) if rng.random() < 0.5 else ""
+        row[12] = rng.choice(("TRUE", "Beca", "FALSE", ""))
+        row[13] = rng.choice(MODALIDADES)
+        row[14] = percent(rng)
+        return row
+
+    def bach_row():
+        row = [""] * 18
+        row[2] = rng.choice(planteles)
+        if rng.random() < 0.3:
+            row[4] = "x"
+        if rng.random() < 0.3:
+            row[10] = "x"
+        row[14] = rng.choice(("TRUE", "Beca", "FALSE", ""))
+        row[15] = rng.choice(("Convenio", "", "TRUE"))
+        row[16] = rng.choice(MODALIDADES)
+        row[17] = percent(rng)
+        return row
+
+    header_lic = [""] * 15
+    header_lic[2] = "Plantel"
+    header_bach = [""] * 18
+    header_bach[2] = "Plantel"
+    for path, header, make_row in (
+        (lic_path, header_lic, lic_row),
+        (lic_online_path, header_lic, lic_row),
+        (bach_path, header_bach, bach_row),
+    ):
+        with path.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for _ in range(row_count):
+                writer.writerow(make_row())
+    return lic_path, lic_online_path, bach_path
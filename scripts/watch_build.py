@@ -0,0 +1,229 @@
+import argparse
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import build_availability_from_xlsx as availability_builder
+import build_benefit_rules_from_csvs as benefit_builder
+import extract_plan_urls
+from benefit_index import BenefitIndex
+from build_cache import sheet_fingerprint
+from build_metrics import StageTimer
+from json_output import write_json
+from workbook_snapshot import open_workbook
+
+POLL_INTERVAL = 0.25
+TARGETS = ("plan-urls", "availability", "benefits")
+
+
+def file_state(path: Path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def replace_atomically(write, data, path: Path):
+    # Readers of ``path`` see the old file or the new one, never a partial
+    # write. JSON outputs get this (and no-op skipping) from write_json.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        write(data, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def write_benefit_index(rules, path: Path):
+    return write_json(BenefitIndex.from_rules(rules).to_json(), path)
+
+
+class WatchState:
+    """Parsed inputs kept between runs.
+
+    Each sheet is read once per workbook save and feeds both the plan URL
+    table and the availability entries; sheets whose content hash did not
+    change keep their entries and links from the previous run.
+    """
+
+    def __init__(self, paths, targets=TARGETS):
+        self.paths = paths
+        self.targets = targets
+        self.seen = {}
+        self.sheets = {}
+
+    def inputs(self):
+        names = []
+        if "plan-urls" in self.targets or "availability" in self.targets:
+            names.append("xlsx")
+        if "availability" in self.targets:
+            names.append("plan_urls")
+        if "benefits" in self.targets:
+            names.extend(("lic", "lic_online", "bach"))
+        return names
+
+    def changed_inputs(self):
+        return {name for name in self.inputs() if file_state(self.paths[name]) != self.seen.get(name, False)}
+
+    def read_workbook(self, timer):
+        # Returns how many sheets had to be rebuilt.
+        rebuilt = 0
+        sheets = {}
+        with open_workbook(self.paths["xlsx"], None) as wb:
+            for name in wb.sheetnames:
+                sheet = timer.run("read", wb.read_sheet, name)
+                digest = timer.run("hash", sheet_fingerprint, sheet)
+                previous = self.sheets.get(name)
+                if previous and previous["hash"] == digest:
+                    sheets[name] = previous
+                    continue
+                rebuilt += 1
+                entries = None
+                if not availability_builder.is_skipped_sheet(name):
+                    entries = availability_builder.build_entries(sheet, timer)
+                links = timer.run("links", extract_plan_urls.collect_program_links, sheet, {})
+                sheets[name] = {"hash": digest, "entries": entries, "links": links}
+        self.sheets = sheets
+        return rebuilt
+
+    def build_plan_urls(self, timer):
+        program_links = {}
+        for sheet in self.sheets.values():
+            for key, value in sheet["links"].items():
+                program_links.setdefault(key, value)
+        rows = extract_plan_urls.plan_url_rows(program_links)
+        path = self.paths["plan_urls"]
+        timer.run("write_plan_urls", replace_atomically, extract_plan_urls.write_plan_urls, rows, path)
+        # Our own write is not an operator edit.
+        self.seen["plan_urls"] = file_state(path)
+        return f"{len(rows)} plan URLs"
+
+    def build_availability(self, timer):
+        rows = timer.run("read_plan_urls", extract_plan_urls.read_plan_urls, self.paths["plan_urls"])
+        plan_url_by_program = extract_plan_urls.plan_urls_from_rows(rows)
+        availability = []
+        debug = []
+        for name, sheet in self.sheets.items():
+            if sheet["entries"] is None:
+                continue
+            # Copies: assemble_payload fills online plan URLs in place.
+            availability.extend(dict(entry) for entry in sheet["entries"])
+            debug.append({"plantel": name, "entries": len(sheet["entries"])})
+        payload = availability_builder.assemble_payload(availability, debug, plan_url_by_program, timer=timer)
+        written = timer.run("write_payload", availability_builder.write_payload, payload, self.paths["availability_output"])
+        return f"{len(payload['availability'])} entries{'' if written['written'] else ', unchanged'}"
+
+    def build_benefits(self, timer):
+        raw_rules = timer.run(
+            "read_csvs", benefit_builder.build_rules, self.paths["lic"], self.paths["lic_online"], self.paths["bach"]
+        )
+        rules = timer.run("compact", benefit_builder.compact_rules, raw_rules)
+        written = timer.run("write_rules", benefit_builder.write_rules, rules, self.paths["benefits_output"])
+        timer.run("write_index", write_benefit_index, rules, self.paths["benefits_index"])
+        return f"{len(rules)} benefit rules{'' if written['written'] else ', unchanged'}"
+
+    def run(self, changed):
+        """Rebuild the outputs that depend on ``changed``; one log line per output."""
+        for name in changed:
+            self.seen[name] = file_state(self.paths[name])
+        missing = [name for name in changed if self.seen[name] is None]
+        for name in missing:
+            log(f"waiting for {name}: {self.paths[name]} does not exist")
+
+        steps = []
+        if "xlsx" in changed and "xlsx" not in missing:
+            steps.append(("workbook", self.read_workbook))
+            if "plan-urls" in self.targets:
+                steps.append(("plan-urls", self.build_plan_urls))
+        if "availability" in self.targets and self.seen.get("xlsx") and changed & {"xlsx", "plan_urls"}:
+            steps.append(("availability", self.build_availability))
+        benefit_inputs = {"lic", "lic_online", "bach"}
+        if changed & benefit_inputs and all(self.seen.get(name) for name in benefit_inputs):
+            steps.append(("benefits", self.build_benefits))
+
+        start = time.perf_counter()
+        summary = []
+        for label, step in steps:
+            timer = StageTimer()
+            try:
+                detail = step(timer)
+            except Exception as exc:
+                # A half-saved input fails to parse; the next save retries.
+                log(f"ERROR {label}: {type(exc).__name__}: {exc}")
+                if label == "workbook":
+                    break
+                continue
+            if label == "workbook":
+                detail = f"{detail}/{len(self.sheets)} sheets rebuilt"
+            stages = ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in timer.stages.items())
+            summary.append(f"{label} {timer.total():.3f}s ({detail}; {stages})")
+        if summary:
+            log(f"{', '.join(sorted(changed))} changed -> " + " | ".join(summary) + f" | total {time.perf_counter() - start:.3f}s")
+
+
+def log(message):
+    print(f"[{datetime.now():%H:%M:%S}] {message}", flush=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Watch the portfolio workbook and price CSVs and rebuild the affected outputs on every save."
+    )
+    parser.add_argument("--xlsx", type=Path, default=availability_builder.XLSX_PATH)
+    parser.add_argument("--plan-urls", type=Path, default=extract_plan_urls.OUTPUT_PATH)
+    parser.add_argument("--lic", type=Path, default=benefit_builder.LIC_PATH)
+    parser.add_argument("--lic-online", type=Path, default=benefit_builder.LIC_ONLINE_PATH)
+    parser.add_argument("--bach", type=Path, default=benefit_builder.BACH_PATH)
+    parser.add_argument("--availability-output", type=Path, default=availability_builder.OUTPUT_PATH)
+    parser.add_argument("--benefits-output", type=Path, default=benefit_builder.OUTPUT_PATH)
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        choices=TARGETS,
+        default=list(TARGETS),
+        help="outputs to keep up to date (plan-urls rewrites programs_plan_urls.csv from the workbook links)",
+    )
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="seconds between polls")
+    parser.add_argument("--once", action="store_true", help="build everything once and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = {
+        "xlsx": args.xlsx,
+        "plan_urls": args.plan_urls,
+        "lic": args.lic,
+        "lic_online": args.lic_online,
+        "bach": args.bach,
+        "availability_output": args.availability_output,
+        "benefits_output": args.benefits_output,
+        "benefits_index": args.benefits_output.with_name(f"{args.benefits_output.stem}_index.json"),
+    }
+    state = WatchState(paths, tuple(args.targets))
+    state.run(state.changed_inputs())
+    if args.once:
+        return
+    log(f"watching {', '.join(str(paths[name]) for name in state.inputs())}")
+    try:
+        while True:
+            time.sleep(args.interval)
+            changed = state.changed_inputs()
+            if not changed:
+                continue
+            # Editors save in several writes; build once the files stop changing.
+            pending = {name: file_state(paths[name]) for name in changed}
+            time.sleep(args.interval)
+            if any(file_state(paths[name]) != stat for name, stat in pending.items()):
+                continue
+            state.run(changed)
+    except KeyboardInterrupt:
+        log("stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+import atexit
+import hashlib
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+from build_cache import builder_fingerprint
+from xlsx_reader import SheetData, XlsxWorkbook
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SNAPSHOT_DIR = BASE_DIR / "scripts" / ".workbook_snapshots"
+SNAPSHOT_MAGIC = b"RCWBSNAP"
+SNAPSHOT_VERSION = 1
+# A snapshot holds what these modules read out of the xlsx; editing them
+# invalidates every snapshot.
+READER_SOURCES = ("xlsx_reader.py", "workbook_snapshot.py")
+HASH_CHUNK = 1 << 20
+# Maps that could not be closed yet because a buffer export was still alive.
+_deferred_maps = []
+
+# Cell tags. Strings (and the ISO text of dates/times) go through the
+# sheet's string table; numbers are stored inline.
+(
+    TAG_NONE,
+    TAG_STR,
+    TAG_INT,
+    TAG_FLOAT,
+    TAG_TRUE,
+    TAG_FALSE,
+    TAG_DATETIME,
+    TAG_DATE,
+    TAG_TIME,
+    TAG_TIMEDELTA,
+    TAG_BIGINT,
+) = range(11)
+U32 = struct.Struct("<I")
+I64 = struct.Struct("<q")
+F64 = struct.Struct("<d")
+TIMEDELTA = struct.Struct("<qqq")
+LINK = struct.Struct("<III")
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(xlsx_path, snapshot_dir: Path = SNAPSHOT_DIR) -> Path:
+    resolved = str(Path(xlsx_path).resolve())
+    return Path(snapshot_dir) / f"{Path(xlsx_path).stem}-{hashlib.sha1(resolved.encode('utf-8')).hexdigest()[:12]}.snap"
+
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def add(self, value: str) -> int:
+        idx = self.ids.get(value)
+        if idx is None:
+            idx = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+
+def encode_cell(value, strings, out: bytearray):
+    # bool before int: bool is an int subclass.
+    if value is None:
+        out.append(TAG_NONE)
+    elif value is True:
+        out.append(TAG_TRUE)
+    elif value is False:
+        out.append(TAG_FALSE)
+    elif isinstance(value, int):
+        if INT64_MIN <= value <= INT64_MAX:
+            out.append(TAG_INT)
+            out += I64.pack(value)
+        else:
+            out.append(TAG_BIGINT)
+            out += U32.pack(strings.add(str(value)))
+    elif isinstance(value, float):
+        out.append(TAG_FLOAT)
+        out += F64.pack(value)
+    elif isinstance(value, str):
+        out.append(TAG_STR)
+        out += U32.pack(strings.add(value))
+    elif isinstance(value, datetime):
+        out.append(TAG_DATETIME)
+        out += U32.pack(strings.add(value.isoformat()))
+    elif isinstance(value, date):
+        out.append(TAG_DATE)
+        out += U32.pack(strings.add(value.isoformat()))
+    elif isinstance(value, time):
+        out.append(TAG_TIME)
+        out += U32.pack(strings.add(value.isoformat()))
+    elif isinstance(value, timedelta):
+        out.append(TAG_TIMEDELTA)
+        out += TIMEDELTA.pack(value.days, value.seconds, value.microseconds)
+    else:
+        raise TypeError(f"Cannot snapshot cell value of type {type(value).__name__}")
+
+
+def encode_sheet(sheet) -> bytes:
+    """Sheet block: string table, row offset table, rows, links, hidden rows."""
+    strings = StringTable()
+    body = bytearray()
+    row_offsets = []
+    for row in sheet.rows:
+        row_offsets.append(len(body))
+        body += U32.pack(len(row))
+        for value in row:
+            encode_cell(value, strings, body)
+    row_offsets.append(len(body))
+
+    links = bytearray()
+    for (r, c), target in sorted(sheet.links_by_cell.items()):
+        links += LINK.pack(r, c, strings.add(target))
+    hidden = sorted(sheet.hidden_rows)
+
+    encoded = [item.encode("utf-8") for item in strings.strings]
+    string_offsets = [0]
+    for item in encoded:
+        string_offsets.append(string_offsets[-1] + len(item))
+    parts = [
+        U32.pack(len(encoded)),
+        struct.pack(f"<{len(string_offsets)}I", *string_offsets),
+        b"".join(encoded),
+        U32.pack(len(sheet.rows)),
+        struct.pack(f"<{len(row_offsets)}I", *row_offsets),
+        bytes(body),
+        U32.pack(len(sheet.links_by_cell)),
+        bytes(links),
+        U32.pack(len(hidden)),
+        struct.pack(f"<{len(hidden)}I", *hidden),
+    ]
+    return b"".join(parts)
+
+
+class SheetStrings:
+    def __init__(self, buffer, offset):
+        (self.count,) = U32.unpack_from(buffer, offset)
+        self.buffer = buffer
+        self.offsets_at = offset + U32.size
+        self.data_at = self.offsets_at + (self.count + 1) * U32.size
+        (total,) = U32.unpack_from(buffer, self.offsets_at + self.count * U32.size)
+        self.end = self.data_at + total
+        self.cache = {}
+
+    def __getitem__(self, idx):
+        value = self.cache.get(idx)
+        if value is None:
+            start, stop = struct.unpack_from("<II", self.buffer, self.offsets_at + idx * U32.size)
+            value = self.cache[idx] = bytes(self.buffer[self.data_at + start : self.data_at + stop]).decode("utf-8")
+        return value
+
+
+class LazyRows(Sequence):
+    """Rows of one snapshot sheet, decoded from the mapped file on access."""
+
+    def __init__(self, buffer, strings, offset):
+        (self.count,) = U32.unpack_from(buffer, offset)
+        self.buffer = buffer
+        self.strings = strings
+        self.offsets_at = offset + U32.size
+        self.body_at = self.offsets_at + (self.count + 1) * U32.size
+        (size,) = U32.unpack_from(buffer, self.offsets_at + self.count * U32.size)
+        self.end = self.body_at + size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self.count))]
+        if idx < 0:
+            idx += self.count
+        if not 0 <= idx < self.count:
+            raise IndexError("row index out of range")
+        (start,) = U32.unpack_from(self.buffer, self.offsets_at + idx * U32.size)
+        return self.decode_row(self.body_at + start)
+
+    def __iter__(self):
+        for idx in range(self.count):
+            yield self[idx]
+
+    def decode_row(self, pos):
+        buffer = self.buffer
+        strings = self.strings
+        (width,) = U32.unpack_from(buffer, pos)
+        pos += U32.size
+        row = []
+        for _ in range(width):
+            tag = buffer[pos]
+            pos += 1
+            if tag == TAG_NONE:
+                row.append(None)
+            elif tag == TAG_STR:
+                row.append(strings[U32.unpack_from(buffer, pos)[0]])
+                pos += U32.size
+            elif tag == TAG_INT:
+                row.append(I64.unpack_from(buffer, pos)[0])
+                pos += I64.size
+            elif tag == TAG_FLOAT:
+                row.append(F64.unpack_from(buffer, pos)[0])
+                pos += F64.size
+            elif tag == TAG_TRUE:
+                row.append(True)
+            elif tag == TAG_FALSE:
+                row.append(False)
+            elif tag == TAG_TIMEDELTA:
+                days, seconds, micros = TIMEDELTA.unpack_from(buffer, pos)
+                row.append(timedelta(days=days, seconds=seconds, microseconds=micros))
+                pos += TIMEDELTA.size
+            else:
+                text = strings[U32.unpack_from(buffer, pos)[0]]
+                pos += U32.size
+                if tag == TAG_DATETIME:
+                    row.append(datetime.fromisoformat(text))
+                elif tag == TAG_DATE:
+                    row.append(date.fromisoformat(text))
+                elif tag == TAG_TIME:
+                    row.append(time.fromisoformat(text))
+                elif tag == TAG_BIGINT:
+                    row.append(int(text))
+                else:
+                    raise ValueError(f"Corrupt workbook snapshot: unknown cell tag {tag}")
+        return row
+
+
+class SnapshotWorkbook:
+    """XlsxWorkbook stand-in backed by a memory-mapped snapshot file.
+
+    Only the header is read up front; read_sheet touches just that sheet's
+    block, and its rows are decoded one at a time as they are accessed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header, self._data_at = read_header(self._mmap)
+        self._sheets = {item["name"]: item for item in self.header["sheets"]}
+        self.sheetnames = [item["name"] for item in self.header["sheets"]]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # Lazy rows hold the map itself, not a view of it, so they do not
+        # block closing; they raise once it is closed, like reads on a closed
+        # XlsxWorkbook. A live memoryview would: such a map is kept and
+        # closed on a later close() or at exit instead of leaking.
+        _deferred_maps.append(self._mmap)
+        close_deferred_maps()
+        self._file.close()
+
+    def iter_sheets(self):
+        for name in self.sheetnames:
+            yield self.read_sheet(name)
+
+    def read_sheet(self, name: str) -> SheetData:
+        item = self._sheets[name]
+        offset = self._data_at + item["offset"]
+        buffer = self._mmap
+        strings = SheetStrings(buffer, offset)
+        rows = LazyRows(buffer, strings, strings.end)
+        pos = rows.end
+        (link_count,) = U32.unpack_from(buffer, pos)
+        pos += U32.size
+        links_by_cell = {}
+        links_by_row = {}
+        for r, c, target_idx in LINK.iter_unpack(buffer[pos : pos + link_count * LINK.size]):
+            target = strings[target_idx]
+            links_by_cell[(r, c)] = target
+            links_by_row.setdefault(r, target)
+        pos += link_count * LINK.size
+        (hidden_count,) = U32.unpack_from(buffer, pos)
+        hidden_rows = set(struct.unpack_from(f"<{hidden_count}I", buffer, pos + U32.size))
+        return SheetData(name, rows, links_by_row, links_by_cell, hidden_rows)
+
+
+@atexit.register
+def close_deferred_maps():
+    for buffer in list(_deferred_maps):
+        try:
+            buffer.close()
+        except BufferError:
+            continue
+        _deferred_maps.remove(buffer)
+
+
+def read_header(buffer):
+    if buffer[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError("Not a workbook snapshot")
+    (length,) = U32.unpack_from(buffer, len(SNAPSHOT_MAGIC))
+    start = len(SNAPSHOT_MAGIC) + U32.size
+    header = json.loads(bytes(buffer[start : start + length]).decode("utf-8"))
+    return header, start + length
+
+
+def read_snapshot_header(path: Path):
+    try:
+        with open(path, "rb") as handle:
+            prefix = handle.read(len(SNAPSHOT_MAGIC) + U32.size)
+            if len(prefix) < len(SNAPSHOT_MAGIC) + U32.size or prefix[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                return None, None
+            (length,) = U32.unpack_from(prefix, len(SNAPSHOT_MAGIC))
+            return json.loads(handle.read(length).decode("utf-8")), len(prefix) + length
+    except (OSError, ValueError, struct.error):
+        return None, None
+
+
+def write_snapshot(path: Path, source, sheet_blocks, reader):
+    """Atomically write header + sheet blocks (a list of (name, bytes))."""
+    sheets = []
+    offset = 0
+    for name, block in sheet_blocks:
+        sheets.append({"name": name, "offset": offset, "length": len(block)})
+        offset += len(block)
+    header = json.dumps(
+        {"version": SNAPSHOT_VERSION, "reader": reader, "source": source, "sheets": sheets},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(SNAPSHOT_MAGIC)
+        handle.write(U32.pack(len(header)))
+        handle.write(header)
+        for _, block in sheet_blocks:
+            handle.write(block)
+    os.replace(tmp_path, path)
+
+
+def source_info(xlsx_path):
+    """mtime, size and hash of the workbook, or None if it changed while
+    being hashed (a save in progress)."""
+    stat = os.stat(xlsx_path)
+    sha256 = file_sha256(xlsx_path)
+    after = os.stat(xlsx_path)
+    if (after.st_mtime_ns, after.st_size) != (stat.st_mtime_ns, stat.st_size):
+        return None
+    return {"mtimeNs": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}
+
+
+def build_snapshot(xlsx_path, path: Path, reader, source=None) -> bool:
+    """Snapshot the workbook; False (nothing written) if it was saved while
+    being parsed, since the blocks may then mix old and new content."""
+    source = source or source_info(xlsx_path)
+    if source is None:
+        return False
+    with XlsxWorkbook(xlsx_path) as wb:
+        blocks = [(sheet.name, encode_sheet(sheet)) for sheet in wb.iter_sheets()]
+    if source_info(xlsx_path) != source:
+        return False
+    write_snapshot(path, source, blocks, reader)
+    return True
+
+
+def ensure_snapshot(xlsx_path, snapshot_dir: Path = SNAPSHOT_DIR):
+    """Path of an up-to-date snapshot of ``xlsx_path``, building it if needed.
+
+    A matching mtime and size is trusted as is; otherwise the workbook is
+    hashed, and a snapshot of identical content is only re-stamped. None
+    when the workbook kept changing while it was read.
+    """
+    path = snapshot_path(xlsx_path, snapshot_dir)
+    reader = builder_fingerprint(READER_SOURCES)
+    header, data_at = read_snapshot_header(path)
+    if header and header.get("version") == SNAPSHOT_VERSION and header.get("reader") == reader:
+        stat = os.stat(xlsx_path)
+        stored = header["source"]
+        if (stored["mtimeNs"], stored["size"]) == (stat.st_mtime_ns, stat.st_size):
+            return path
+        source = source_info(xlsx_path)
+        if source is None:
+            return None
+        if source["sha256"] == stored["sha256"]:
+            with open(path, "rb") as handle:
+                handle.seek(data_at)
+                blocks = [(item["name"], handle.read(item["length"])) for item in header["sheets"]]
+            write_snapshot(path, source, blocks, reader)
+            return path
+        return path if build_snapshot(xlsx_path, path, reader, source) else None
+    return path if build_snapshot(xlsx_path, path, reader) else None
+
+
+def open_workbook(xlsx_path, snapshot_dir: Path = SNAPSHOT_DIR):
+    """A SnapshotWorkbook for ``xlsx_path``, or a plain XlsxWorkbook when
+    ``snapshot_dir`` is None or no consistent snapshot could be taken."""
+    path = None if snapshot_dir is None else ensure_snapshot(xlsx_path, snapshot_dir)
+    if path is None:
+        return XlsxWorkbook(xlsx_path)
+    return SnapshotWorkbook(path)
@@ -0,0 +1,501 @@
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, time, timedelta
+from typing import NamedTuple
+
+PACKAGE_RELS_PATH = "_rels/.rels"
+WORKSHEET_REL_SUFFIX = "/worksheet"
+OFFICE_DOCUMENT_REL_SUFFIX = "/officeDocument"
+
+# Built-in number formats that openpyxl reads back as dates/times.
+BUILTIN_DATE_FORMAT_IDS = set(range(14, 23)) | {45, 46, 47}
+DATE_FORMAT_RE = re.compile(r"[dmyhs]", re.IGNORECASE)
+DATE_FORMAT_STRIP_RE = re.compile(r'"[^"]*"|\\.|\[(?!h+\]|m+\]|s+\])[^\]]*\]|_.|\*.')
+TIMEDELTA_FORMAT_RE = re.compile(r"\[hh?\](:mm(:ss(\.0*)?)?)?|\[mm?\](:ss(\.0*)?)?|\[ss?\](\.0*)?")
+CELL_REF_RE = re.compile(r"^\$?([A-Z]+)\$?(\d+)$")
+
+WINDOWS_EPOCH = datetime(1899, 12, 30)
+MAC_EPOCH = datetime(1904, 1, 1)
+SECS_PER_DAY = 86400
+
+
+class SheetData(NamedTuple):
+    name: str
+    rows: list
+    links_by_row: dict
+    links_by_cell: dict
+    hidden_rows: set
+
+
+def local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def attr(elem, name: str, default=None):
+    for key, value in elem.attrib.items():
+        if local_name(key) == name:
+            return value
+    return default
+
+
+def column_index(letters: str) -> int:
+    index = 0
+    for char in letters:
+        index = index * 26 + (ord(char) - 64)
+    return index
+
+
+def parse_cell_ref(ref: str):
+    match = CELL_REF_RE.match(ref.strip().upper())
+    if not match:
+        return None
+    return int(match.group(2)), column_index(match.group(1))
+
+
+def parse_range_ref(ref: str):
+    start, _, end = ref.partition(":")
+    first = parse_cell_ref(start)
+    last = parse_cell_ref(end) if end else first
+    if not first or not last:
+        return None
+    return first, last
+
+
+def is_flag_set(value) -> bool:
+    return str(value or "").strip().lower() in ("1", "true")
+
+
+def is_date_format(fmt: str) -> bool:
+    if not fmt:
+        return False
+    stripped = DATE_FORMAT_STRIP_RE.sub("", fmt.split(";")[0])
+    return bool(DATE_FORMAT_RE.search(stripped))
+
+
+def from_excel(value, epoch, as_timedelta=False):
+    if as_timedelta:
+        return timedelta(milliseconds=round(value * SECS_PER_DAY * 1000))
+    day, fraction = divmod(value, 1)
+    diff = timedelta(milliseconds=round(fraction * SECS_PER_DAY * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        seconds, micro = divmod(diff.total_seconds(), 1)
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return time(hours, minutes, seconds, round(micro * 1_000_000))
+    if 0 < value < 60 and epoch == WINDOWS_EPOCH:
+        day += 1
+    return epoch + timedelta(days=day) + diff
+
+
+def cast_number(text: str):
+    if "." in text or "E" in text or "e" in text:
+        return float(text)
+    return int(text)
+
+
+def rich_text(elem) -> str:
+    # Plain <t> plus rich-text runs <r><t>, skipping phonetic hints (<rPh>).
+    parts = []
+    for child in elem:
+        name = local_name(child.tag)
+        if name == "t":
+            parts.append(child.text or "")
+        elif name == "r":
+            for run_child in child:
+                if local_name(run_child.tag) == "t":
+                    parts.append(run_child.text or "")
+    return "".join(parts)
+
+
+def merged_follower_cells(merged):
+    # Every cell of a merged range except its top-left one, mapped to it.
+    followers = {}
+    for (min_r, min_c), (max_r, max_c) in merged:
+        for r in range(min_r, max_r + 1):
+            for c in range(min_c, max_c + 1):
+                if (r, c) != (min_r, min_c):
+                    followers[(r, c)] = (min_r, min_c)
+    return followers
+
+
+def index_links(link_cells):
+    # 1-based (row, col) -> target into 0-based links_by_row / links_by_cell.
+    links_by_row = {}
+    links_by_cell = {}
+    for (r, c) in sorted(link_cells):
+        target = link_cells[(r, c)]
+        if not target:
+            continue
+        links_by_cell[(r - 1, c - 1)] = target
+        links_by_row.setdefault(r - 1, target)
+    return links_by_row, links_by_cell
+
+
+class SheetStream:
+    """A sheet read one row at a time.
+
+    Iterating yields ``(row index, values, hidden)`` for the rows present in
+    the sheet, 0-based and without padding to the sheet width. Hyperlinks
+    follow the cell data in the sheet XML, so ``links_by_row`` and
+    ``links_by_cell`` are only filled in once iteration has finished, and a
+    linked cell with no value stays empty here (read_sheet, like openpyxl,
+    shows the link target in it).
+    """
+
+    def __init__(self, name, rows):
+        self.name = name
+        self._rows = rows
+        self.links_by_row = None
+        self.links_by_cell = None
+        self.row_count = 0
+        self.cell_count = 0
+        self.hidden_count = 0
+
+    def __iter__(self):
+        while True:
+            try:
+                r_idx, values, hidden = next(self._rows)
+            except StopIteration as done:
+                self.links_by_row, self.links_by_cell = done.value
+                return
+            self.row_count = r_idx + 1
+            self.cell_count += len(values)
+            self.hidden_count += hidden
+            yield r_idx, values, hidden
+
+
+class XlsxWorkbook:
+    """Reads cell values, hyperlinks and hidden rows straight from the xlsx zip.
+
+    Values follow ``openpyxl.load_workbook(..., data_only=True)``: cached formula
+    results, ints/floats for numbers, dates/times for date-formatted cells, and
+    the link target in a hyperlinked cell that has no value. Each sheet is parsed in a single streaming pass over its XML part.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        self._shared_strings = None
+        self._styles = None
+        self._workbook_path = self._find_workbook_path()
+        self._sheet_paths = {}
+        self._epoch = WINDOWS_EPOCH
+        self.sheetnames = []
+        self._read_workbook()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    def _read_xml(self, member: str):
+        with self._zip.open(member) as handle:
+            return ET.parse(handle).getroot()
+
+    def _has_member(self, member: str) -> bool:
+        try:
+            self._zip.getinfo(member)
+        except KeyError:
+            return False
+        return True
+
+    def _read_rels(self, rels_path: str, base_dir: str):
+        rels = {}
+        if not self._has_member(rels_path):
+            return rels
+        for rel in self._read_xml(rels_path):
+            target = rel.get("Target", "")
+            rels[rel.get("Id")] = {
+                "type": rel.get("Type", ""),
+                "target": target,
+                "mode": rel.get("TargetMode", ""),
+                "path": self._resolve_part(base_dir, target),
+            }
+        return rels
+
+    @staticmethod
+    def _resolve_part(base_dir: str, target: str) -> str:
+        if target.startswith("/"):
+            return target.lstrip("/")
+        return posixpath.normpath(posixpath.join(base_dir, target))
+
+    def _find_workbook_path(self) -> str:
+        for rel in self._read_rels(PACKAGE_RELS_PATH, "").values():
+            if rel["type"].endswith(OFFICE_DOCUMENT_REL_SUFFIX):
+                return rel["path"]
+        return "xl/workbook.xml"
+
+    def _read_workbook(self):
+        root = self._read_xml(self._workbook_path)
+        base_dir = posixpath.dirname(self._workbook_path)
+        rels_path = posixpath.join(base_dir, "_rels", posixpath.basename(self._workbook_path) + ".rels")
+        rels = self._read_rels(rels_path, base_dir)
+        for elem in root:
+            name = local_name(elem.tag)
+            if name == "workbookPr" and is_flag_set(elem.get("date1904")):
+                self._epoch = MAC_EPOCH
+            if name != "sheets":
+                continue
+            for sheet in elem:
+                rel = rels.get(attr(sheet, "id"))
+                if not rel or not rel["type"].endswith(WORKSHEET_REL_SUFFIX):
+                    continue
+                title = sheet.get("name", "")
+                self.sheetnames.append(title)
+                self._sheet_paths[title] = rel["path"]
+
+    def _load_shared_strings(self):
+        if self._shared_strings is not None:
+            return self._shared_strings
+        strings = []
+        member = posixpath.join(posixpath.dirname(self._workbook_path), "sharedStrings.xml")
+        if self._has_member(member):
+            with self._zip.open(member) as handle:
+                for _, elem in ET.iterparse(handle):
+                    if local_name(elem.tag) == "si":
+                        strings.append(rich_text(elem).replace("x005F_", ""))
+                        elem.clear()
+        self._shared_strings = strings
+        return strings
+
+    def _load_styles(self):
+        # Maps cellXfs index -> "date" / "timedelta" / None.
+        if self._styles is not None:
+            return self._styles
+        styles = []
+        member = posixpath.join(posixpath.dirname(self._workbook_path), "styles.xml")
+        if self._has_member(member):
+            root = self._read_xml(member)
+            custom_formats = {}
+            for elem in root:
+                if local_name(elem.tag) == "numFmts":
+                    for fmt in elem:
+                        custom_formats[int(fmt.get("numFmtId", "0"))] = fmt.get("formatCode", "")
+            for elem in root:
+                if local_name(elem.tag) != "cellXfs":
+                    continue
+                for xf in elem:
+                    fmt_id = int(xf.get("numFmtId", "0"))
+                    fmt = custom_formats.get(fmt_id)
+                    if fmt is None:
+                        styles.append("date" if fmt_id in BUILTIN_DATE_FORMAT_IDS else None)
+                    elif TIMEDELTA_FORMAT_RE.search(fmt):
+                        styles.append("timedelta")
+                    elif is_date_format(fmt):
+                        styles.append("date")
+                    else:
+                        styles.append(None)
+        self._styles = styles
+        return styles
+
+    def _cell_value(self, elem):
+        cell_type = elem.get("t", "n")
+        raw = None
+        inline = None
+        for child in elem:
+            name = local_name(child.tag)
+            if name == "v":
+                raw = child.text
+            elif name == "is":
+                inline = rich_text(child)
+        if cell_type == "inlineStr":
+            return inline
+        if raw is None:
+            return None
+        if cell_type == "s":
+            return self._load_shared_strings()[int(raw)]
+        if cell_type == "b":
+            return bool(int(raw))
+        if cell_type in ("str", "e"):
+            return raw
+        if cell_type == "d":
+            try:
+                return datetime.fromisoformat(raw)
+            except ValueError:
+                return raw
+        value = cast_number(raw)
+        style_idx = elem.get("s")
+        if style_idx is not None:
+            styles = self._load_styles()
+            idx = int(style_idx)
+            kind = styles[idx] if idx < len(styles) else None
+            if kind == "date":
+                return from_excel(value, self._epoch)
+            if kind == "timedelta":
+                return from_excel(value, self._epoch, as_timedelta=True)
+        return value
+
+    def iter_sheets(self):
+        for name in self.sheetnames:
+            yield self.read_sheet(name)
+
+    def _read_link_targets(self, rels_path: str):
+        # Relationship id -> Target, streamed: a sheet with one link per
+        # program row has as many relationships as rows.
+        targets = {}
+        if not self._has_member(rels_path):
+            return targets
+        with self._zip.open(rels_path) as handle:
+            root = None
+            for event, elem in ET.iterparse(handle, events=("start", "end")):
+                if event == "start":
+                    if root is None:
+                        root = elem
+                    continue
+                if elem is not root:
+                    targets[elem.get("Id")] = elem.get("Target", "")
+                    root.clear()
+        return targets
+
+    def _link_cells(self, sheet_path, merged, hyperlinks):
+        # (1-based cell -> target, 1-based cell -> value openpyxl gives the
+        # cell if it has none, (max row, max col) the ranges reach).
+        max_row = max((max_r for _, (max_r, _) in merged), default=0)
+        max_col = max((max_c for _, (_, max_c) in merged), default=0)
+        merged_followers = merged_follower_cells(merged)
+        link_cells = {}
+        link_values = {}
+        if hyperlinks:
+            rels_path = posixpath.join(posixpath.dirname(sheet_path), "_rels", posixpath.basename(sheet_path) + ".rels")
+            targets = self._read_link_targets(rels_path)
+            for ref, rel_id, location in hyperlinks:
+                bounds = parse_range_ref(ref)
+                if not bounds:
+                    continue
+                target = targets.get(rel_id) if rel_id else None
+                # openpyxl's hyperlink setter fills a valueless cell with
+                # ``target or location``; the first link to do so wins.
+                value = target or location
+                (min_r, min_c), (max_r, max_c) = bounds
+                max_row = max(max_row, max_r)
+                max_col = max(max_col, max_c)
+                if bounds[0] == bounds[1]:
+                    # A link on a merged cell belongs to the range's top-left cell.
+                    key = merged_followers.get((min_r, min_c), (min_r, min_c))
+                    link_cells[key] = target
+                    if value is not None:
+                        link_values.setdefault(key, value)
+                    continue
+                for r in range(min_r, max_r + 1):
+                    for c in range(min_c, max_c + 1):
+                        if (r, c) not in merged_followers:
+                            link_cells[(r, c)] = target
+                            if value is not None:
+                                link_values.setdefault((r, c), value)
+        return link_cells, link_values, (max_row, max_col)
+
+    def stream_sheet(self, name: str) -> SheetStream:
+        """The sheet as a SheetStream; only the current row's cells are held."""
+        return SheetStream(name, self._iter_rows(name))
+
+    def _iter_rows(self, name: str):
+        sheet_path = self._sheet_paths[name]
+        merged = []
+        hyperlinks = []
+        container = None
+        current_row = 0
+        current_col = 0
+        values = []
+        hidden = False
+
+        with self._zip.open(sheet_path) as handle:
+            for event, elem in ET.iterparse(handle, events=("start", "end")):
+                name_tag = local_name(elem.tag)
+                if event == "start":
+                    if name_tag == "row":
+                        row_ref = elem.get("r")
+                        current_row = int(row_ref) if row_ref else current_row + 1
+                        current_col = 0
+                        values = []
+                        hidden = is_flag_set(elem.get("hidden"))
+                    elif name_tag in ("sheetData", "mergeCells", "hyperlinks"):
+                        container = elem
+                    continue
+                if name_tag == "c":
+                    ref = parse_cell_ref(elem.get("r", "")) if elem.get("r") else None
+                    current_col = ref[1] if ref else current_col + 1
+                    value = self._cell_value(elem)
+                    if value is not None:
+                        values.extend([None] * (current_col - len(values)))
+                        values[current_col - 1] = value
+                    elem.clear()
+                    continue
+                if name_tag == "row":
+                    yield current_row - 1, values, hidden
+                elif name_tag == "mergeCell":
+                    bounds = parse_range_ref(elem.get("ref", ""))
+                    if bounds:
+                        merged.append(bounds)
+                elif name_tag == "hyperlink":
+                    hyperlinks.append((elem.get("ref", ""), attr(elem, "id"), elem.get("location")))
+                else:
+                    continue
+                # Drop finished rows and ranges from the tree so it stays flat.
+                if container is not None:
+                    container.clear()
+
+        link_cells, _, _ = self._link_cells(sheet_path, merged, hyperlinks)
+        return index_links(link_cells)
+
+    def read_sheet(self, name: str) -> SheetData:
+        sheet_path = self._sheet_paths[name]
+        cells = {}
+        hidden = set()
+        merged = []
+        hyperlinks = []
+        max_row = 0
+        max_col = 0
+        current_row = 0
+        current_col = 0
+
+        with self._zip.open(sheet_path) as handle:
+            for event, elem in ET.iterparse(handle, events=("start", "end")):
+                name_tag = local_name(elem.tag)
+                if event == "start":
+                    if name_tag == "row":
+                        row_ref = elem.get("r")
+                        current_row = int(row_ref) if row_ref else current_row + 1
+                        current_col = 0
+                        if is_flag_set(elem.get("hidden")):
+                            hidden.add(current_row)
+                    continue
+                if name_tag == "c":
+                    ref = parse_cell_ref(elem.get("r", "")) if elem.get("r") else None
+                    if ref:
+                        row_num, current_col = ref
+                    else:
+                        row_num, current_col = current_row, current_col + 1
+                    value = self._cell_value(elem)
+                    if value is not None:
+                        cells[(row_num, current_col)] = value
+                    max_row = max(max_row, row_num)
+                    max_col = max(max_col, current_col)
+                    elem.clear()
+                elif name_tag == "row":
+                    elem.clear()
+                elif name_tag == "mergeCell":
+                    bounds = parse_range_ref(elem.get("ref", ""))
+                    if bounds:
+                        merged.append(bounds)
+                elif name_tag == "hyperlink":
+                    hyperlinks.append((elem.get("ref", ""), attr(elem, "id"), elem.get("location")))
+
+        link_cells, link_values, (link_max_row, link_max_col) = self._link_cells(sheet_path, merged, hyperlinks)
+        max_row = max(max_row, link_max_row)
+        max_col = max(max_col, link_max_col)
+        for key, value in link_values.items():
+            cells.setdefault(key, value)
+
+        rows = [[None] * max_col for _ in range(max_row)]
+        for (r, c), value in cells.items():
+            rows[r - 1][c - 1] = value
+
+        links_by_row, links_by_cell = index_links(link_cells)
+        hidden_rows = {r - 1 for r in hidden if r <= max_row}
+        return SheetData(name, rows, links_by_row, links_by_cell, hidden_rows)
@@ -0,0 +1,106 @@
+import itertools
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from benefit_index import BenefitIndex, linear_resolve  # noqa: E402
+
+LINEAS = ["licenciatura", "salud", "maestria", "preparatoria"]
+PLANTELES = ["Aguascalientes", "Culiacán", "Querétaro", "Cd. Obregón", "Los Cabos", "ONLINE"]
+MODALIDADES = ["presencial", "online", "mixta"]
+PLANES = ["6", "9", "11", 4, 9]
+ANY = ["todos", "Todos", "*", " TODOS "]
+
+
+def random_rules(rng, count):
+    """Rules drawn from small pools, so patterns overlap and scores tie often."""
+
+    def pick(pool, any_rate=0.35):
+        return rng.choice(ANY) if rng.random() < any_rate else rng.choice(pool)
+
+    rules = []
+    for position in range(count):
+        planteles = [pick(PLANTELES, 0.15) for _ in range(rng.randint(0, 3))]
+        rules.append(
+            {
+                "lineaNegocio": pick(LINEAS),
+                # List or bare string, the way both shapes reach resolveDefaultBenefit.
+                "plantel": planteles[0] if len(planteles) == 1 and rng.random() < 0.5 else planteles,
+                "modalidad": pick(MODALIDADES),
+                "plan": pick(PLANES),
+                "activo": True,
+                "porcentaje": rng.choice([10, 15, 20, 25]),
+                "comentario": f"regla {position}",
+            }
+        )
+    # Exact duplicates of earlier rules: the earliest must still win.
+    for _ in range(count // 5):
+        rules.append(dict(rng.choice(rules), comentario="duplicada"))
+    return rules
+
+
+def query_variants(value):
+    text = str(value)
+    return [value, text.upper(), f"  {text} ", f"\t{text.title()}\n"]
+
+
+class BenefitIndexMatchesLinearScan(unittest.TestCase):
+    def assert_same_rule(self, rules, queries):
+        index = BenefitIndex.from_rules(rules)
+        for query in queries:
+            expected = linear_resolve(rules, *query)
+            actual = index.resolve(*query)
+            self.assertIs(actual, expected, f"query {query!r}")
+
+    def test_random_rule_sets(self):
+        rng = random.Random(20260117)
+        lineas = LINEAS + ["doctorado", "*", "todos"]
+        planteles = PLANTELES + ["Mérida", "*", ""]
+        modalidades = MODALIDADES + ["ejecutiva", "todos"]
+        planes = PLANES + ["4", "12", "abc", None, 6.5]
+        for _ in range(60):
+            rules = random_rules(rng, rng.randint(1, 14))
+            queries = [
+                (rng.choice(query_variants(linea)), rng.choice(query_variants(plantel)), rng.choice(query_variants(modalidad)), plan)
+                for linea, plantel, modalidad, plan in itertools.product(lineas, planteles, modalidades, planes)
+            ]
+            self.assert_same_rule(rules, rng.sample(queries, 600))
+
+    def test_earliest_rule_wins_ties(self):
+        rules = [
+            {"lineaNegocio": "salud", "plantel": ["todos"], "modalidad": "online", "plan": "*", "porcentaje": 10},
+            {"lineaNegocio": "todos", "plantel": "Culiacán", "modalidad": "online", "plan": "*", "porcentaje": 20},
+            {"lineaNegocio": "salud", "plantel": ["*"], "modalidad": "online", "plan": "*", "porcentaje": 30},
+        ]
+        index = BenefitIndex.from_rules(rules)
+        self.assertIs(index.resolve("salud", "Culiacán", "online", 9), rules[0])
+        self.assertIs(index.resolve("SALUD", " Mérida ", "Online", "9"), rules[0])
+        self.assertIs(index.resolve("maestria", "CULIACÁN", "online", 6), rules[1])
+        self.assert_same_rule(
+            rules,
+            itertools.product(["salud", "maestria", "*"], ["Culiacán", "Mérida", "*"], ["online", "presencial"], [6, "9"]),
+        )
+
+    def test_rules_without_planteles_never_match(self):
+        rules = [
+            {"lineaNegocio": "todos", "plantel": [], "modalidad": "todos", "plan": "*", "porcentaje": 50},
+            {"lineaNegocio": "todos", "modalidad": "todos", "plan": "*", "porcentaje": 40},
+        ]
+        self.assertIsNone(BenefitIndex.from_rules(rules).resolve("salud", "Culiacán", "online", 9))
+        self.assertIsNone(linear_resolve(rules, "salud", "Culiacán", "online", 9))
+
+    def test_index_survives_json_round_trip(self):
+        rng = random.Random(7)
+        rules = random_rules(rng, 12)
+        index = BenefitIndex.from_json(BenefitIndex.from_rules(rules).to_json())
+        for query in itertools.product(LINEAS + ["x"], PLANTELES + ["x"], MODALIDADES, PLANES):
+            expected = linear_resolve(rules, *query)
+            actual = index.resolve(*query)
+            self.assertEqual(actual, expected, f"query {query!r}")
+
+
+if __name__ == "__main__":
+    unittest.main()